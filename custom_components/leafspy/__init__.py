@@ -1,21 +1,30 @@
 """Support for Leaf Spy."""
-import asyncio
 import hmac
 import logging
 
 from aiohttp.web import Response
 import voluptuous as vol
 
+from homeassistant.components import mqtt
 from homeassistant.components.http.view import HomeAssistantView
 from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
-from homeassistant.core import callback, HomeAssistant
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers import config_validation as cv
-from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
 
 
+from .backfill import async_setup_services
 from .config_flow import CONF_SECRET, DOMAIN, URL_LEAFSPY_PATH
+from .const import CONF_MQTT_BATCH_WINDOW, CONF_MQTT_TOPIC, DEFAULT_MQTT_BATCH_WINDOW
 from .device_tracker import async_handle_message
+from .frame import device_id, parse_query
+from .mqtt_bridge import LeafSpyMqttBridge
+from .pipeline import LeafSpyContext, PipelineOptions, async_get_context
+from .range_model import LeafSpyRangeEstimator
+from .store import LeafSpyStore
+from .trips import LeafSpyTripRecorder, async_setup_trip_services
+from .websocket import async_setup_websocket
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,11 +35,10 @@ CONFIG_SCHEMA = cv.empty_config_schema(DOMAIN)
 
 async def async_setup(hass, config):
     """Initialize Leaf Spy component."""
-    hass.data[DOMAIN] = {
-        'devices': {},
-        'sensors': {},
-        'unsub': None,
-    }
+    hass.http.register_view(LeafSpyView())
+    async_setup_services(hass)
+    async_setup_trip_services(hass)
+    async_setup_websocket(hass)
     return True
 
 
@@ -38,60 +46,99 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up Leaf Spy entry."""
     secret = entry.data[CONF_SECRET]
 
-    context = LeafSpyContext(hass, secret)
+    store = LeafSpyStore(hass)
+    await store.async_load()
 
-    hass.data[DOMAIN]['context'] = context
+    context = LeafSpyContext(
+        hass, secret, store, PipelineOptions.from_options(entry.options)
+    )
+    context.range_estimator = LeafSpyRangeEstimator(hass, store)
+    context.trip_recorder = LeafSpyTripRecorder(hass, store)
 
-    hass.http.register_view(LeafSpyView())
+    entry.runtime_data = context
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-    
-    hass.data[DOMAIN]['unsub'] = \
+
+    entry.async_on_unload(
         async_dispatcher_connect(hass, DOMAIN, async_handle_message)
+    )
+    entry.async_on_unload(context.range_estimator.async_start())
+    entry.async_on_unload(context.trip_recorder.async_start())
+
+    await _async_setup_mqtt_bridge(hass, entry)
+    entry.async_on_unload(entry.add_update_listener(_async_update_options))
+
+    entry.async_create_background_task(
+        hass, context.async_process_queue(), "leafspy_queue"
+    )
 
     return True
 
 
-async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
-    """Unload a config entry."""
-    unload_ok = all(
-        await asyncio.gather(
-            *[
-                hass.config_entries.async_forward_entry_unload(entry, component)
-                for component in PLATFORMS
-            ]
-        )
-    )
-    if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+async def _async_setup_mqtt_bridge(hass: HomeAssistant, entry: ConfigEntry):
+    """Start the MQTT bridge if a topic is configured.
 
-    hass.data[DOMAIN]["unsub"]()
+    A running bridge is only replaced when its topic or batch window
+    changed, so other option changes don't touch frames it is batching.
+    """
+    topic = entry.options.get(CONF_MQTT_TOPIC)
+    batch_window = entry.options.get(CONF_MQTT_BATCH_WINDOW, DEFAULT_MQTT_BATCH_WINDOW)
 
-    return True
+    bridge = entry.runtime_data.mqtt_bridge
+    if (
+        bridge is not None
+        and topic
+        and (bridge.topic, bridge.batch_window) == (topic.rstrip('/'), batch_window)
+    ):
+        return
 
+    await _async_stop_mqtt_bridge(entry)
+    if not topic:
+        return
 
-class LeafSpyContext:
-    """Hold the current Leaf Spy context."""
+    if not await mqtt.async_wait_for_mqtt_client(hass):
+        _LOGGER.warning("MQTT is not available, not republishing Leaf Spy data")
+        return
 
-    def __init__(self, hass, secret):
-        """Initialize a Leaf Spy context."""
-        self.hass = hass
-        self.secret = secret
-        self._pending_msg = []
+    bridge = LeafSpyMqttBridge(hass, topic, batch_window)
+    bridge.async_start()
+    entry.runtime_data.mqtt_bridge = bridge
 
-    @callback
-    def set_async_see(self, func):
-        """Set a new async_see function."""
-        self.async_see = func
-        for msg in self._pending_msg:
-            func(**msg)
-        self._pending_msg.clear()
 
-    # pylint: disable=method-hidden
-    @callback
-    def async_see(self, **data):
-        """Send a see message to the device tracker."""
-        self._pending_msg.append(data)
+async def _async_stop_mqtt_bridge(entry: ConfigEntry):
+    """Stop the MQTT bridge of an entry, if running."""
+    context = entry.runtime_data
+    bridge, context.mqtt_bridge = context.mqtt_bridge, None
+    if bridge is not None:
+        await bridge.async_stop()
+
+
+async def _async_update_options(hass: HomeAssistant, entry: ConfigEntry):
+    """Apply changed options to the running pipeline."""
+    entry.runtime_data.async_apply_options(
+        PipelineOptions.from_options(entry.options)
+    )
+    await _async_setup_mqtt_bridge(hass, entry)
+
+
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Unload a config entry."""
+    context = entry.runtime_data
+
+    # Listeners and the queue task are only torn down through
+    # async_on_unload after this returns. Stop the queue that feeds them
+    # first, so nothing schedules another save of this store once the
+    # snapshot below is written.
+    context.async_stop()
+
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+
+    # Publish what the bridge is still batching rather than dropping it
+    await _async_stop_mqtt_bridge(entry)
+
+    # Write the snapshot now, so a reload doesn't lose up to SAVE_DELAY of it
+    await context.store.async_save()
+    return unload_ok
 
 
 class LeafSpyView(HomeAssistantView):
@@ -104,14 +151,19 @@ class LeafSpyView(HomeAssistantView):
     async def get(self, request):
         """Handle leafspy call."""
         hass = request.app['hass']
-        context = hass.data[DOMAIN]['context']
+        context = async_get_context(hass)
+        if context is None:
+            return Response(status=503, text="")
 
         try:
-            message = request.query
+            message = parse_query(request.rel_url.raw_query_string)
             if not hmac.compare_digest(message['pass'], context.secret):
                 raise Exception("Invalid password")
 
-            async_dispatcher_send(hass, DOMAIN, context, message)
+            if 'VIN' in message:
+                context.store.async_update_frame(device_id(message['VIN']), message)
+
+            context.async_enqueue(message)
 
             return Response(status=200, text='"status":"0"')
         except Exception:  # pylint: disable=broad-except
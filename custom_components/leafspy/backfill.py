@@ -0,0 +1,268 @@
+"""Import backfilled Leaf Spy samples into long-term statistics."""
+from datetime import datetime, timedelta
+import logging
+
+import voluptuous as vol
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.statistics import (
+    STATISTIC_UNIT_TO_UNIT_CONVERTER,
+    async_import_statistics,
+    get_last_statistics,
+    statistics_during_period,
+)
+from homeassistant.components.sensor import SensorStateClass
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv, entity_registry
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .frame import device_id
+from .sensor import SENSOR_TYPES
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_IMPORT_STATISTICS = "import_statistics"
+
+ATTR_VIN = "vin"
+ATTR_SAMPLES = "samples"
+ATTR_TIME = "time"
+
+SAMPLE_SCHEMA = vol.Schema(
+    {vol.Required(ATTR_TIME): cv.datetime},
+    extra=vol.ALLOW_EXTRA,
+)
+
+IMPORT_STATISTICS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_VIN): cv.string,
+        vol.Required(ATTR_SAMPLES): vol.All(cv.ensure_list, [SAMPLE_SCHEMA]),
+    }
+)
+
+# Only measurement sensors can be rebuilt from samples alone; totals need
+# the running sum from before the first sample, which we don't have.
+STATISTICS_TYPES = [
+    description
+    for description in SENSOR_TYPES
+    if description.state_class == SensorStateClass.MEASUREMENT
+]
+
+HOUR = timedelta(hours=1)
+
+
+def _hour_start(when: datetime) -> datetime:
+    """Return the start of the hour bucket a sample falls in."""
+    return dt_util.as_utc(when).replace(minute=0, second=0, microsecond=0)
+
+
+def _entity_unit(hass, entry, description):
+    """Return the unit the statistics of an entity are kept in.
+
+    This is the unit the entity displays, which the user may have changed
+    from the unit Leaf Spy reports.
+    """
+    if (state := hass.states.get(entry.entity_id)) is not None:
+        if ATTR_UNIT_OF_MEASUREMENT in state.attributes:
+            return state.attributes[ATTR_UNIT_OF_MEASUREMENT]
+    sensor_options = entry.options.get("sensor", {})
+    if "unit_of_measurement" in sensor_options:
+        return sensor_options["unit_of_measurement"]
+    return description.native_unit_of_measurement
+
+
+def _unit_converter(from_unit, to_unit):
+    """Return a function converting values between units, or None."""
+    if from_unit == to_unit:
+        return lambda value: value
+    converter = STATISTIC_UNIT_TO_UNIT_CONVERTER.get(from_unit)
+    if converter is None or to_unit not in converter.VALID_UNITS:
+        return None
+    return converter.converter_factory(from_unit, to_unit)
+
+
+def _sample_points(description, samples, convert):
+    """Return the (time, value) points of one sensor, oldest first."""
+    points = []
+    for sample in samples:
+        value = sample.get(description.leafspy_key)
+        if value is None:
+            continue
+        try:
+            value = convert(float(description.transform_fn(value)))
+        except (ValueError, TypeError):
+            continue
+        points.append((dt_util.as_utc(sample[ATTR_TIME]), value))
+    points.sort(key=lambda point: point[0])
+    return points
+
+
+def _hourly_statistics(points):
+    """Reduce points to one time-weighted mean/min/max row per hour.
+
+    As in the recorder, a value counts for as long as it was held: until
+    the next point, or the end of its hour for the last one. A value held
+    into a later hour counts for that hour too. Hours without a point get
+    no row.
+    """
+    hours = {
+        _hour_start(when): {"weighted": 0.0, "seconds": 0.0, "min": None, "max": None}
+        for when, _ in points
+    }
+    for index, (when, value) in enumerate(points):
+        if index + 1 < len(points):
+            until = points[index + 1][0]
+        else:
+            until = _hour_start(when) + HOUR
+
+        start = when
+        while True:
+            hour = _hour_start(start)
+            end = min(until, hour + HOUR)
+            if (totals := hours.get(hour)) is not None:
+                seconds = (end - start).total_seconds()
+                totals["weighted"] += value * seconds
+                totals["seconds"] += seconds
+                if totals["min"] is None or value < totals["min"]:
+                    totals["min"] = value
+                if totals["max"] is None or value > totals["max"]:
+                    totals["max"] = value
+            if end >= until:
+                break
+            start = end
+
+    return [
+        {
+            "start": hour,
+            "mean": totals["weighted"] / totals["seconds"],
+            "min": totals["min"],
+            "max": totals["max"],
+        }
+        for hour, totals in sorted(hours.items())
+    ]
+
+
+def _import_cutoff(hass, statistic_id):
+    """Return the hour from which samples are too recent to import.
+
+    This is the last hour the recorder compiled for the sensor or, before
+    it compiled any, the previous hour, which may still be compiling.
+    """
+    last = get_last_statistics(hass, 1, statistic_id, False, {"mean"})
+    if rows := last.get(statistic_id):
+        return dt_util.utc_from_timestamp(rows[0]["start"])
+    return _hour_start(dt_util.utcnow()) - HOUR
+
+
+def _compiled_hours(hass, statistic_id, start, end):
+    """Return the hours between start and end that already have statistics."""
+    stats = statistics_during_period(
+        hass, start, end, {statistic_id}, "hour", None, {"mean"}
+    )
+    return {
+        dt_util.utc_from_timestamp(row["start"])
+        for row in stats.get(statistic_id, [])
+    }
+
+
+async def async_import_samples(hass: HomeAssistant, vin: str, samples: list) -> int:
+    """Write time-stamped samples for a car straight into statistics.
+
+    Samples are reduced to one time-weighted mean/min/max row per hour and
+    handed to the recorder in a single import per sensor; no entity state
+    is written. Hours that already have statistics are left alone, and
+    samples from the last compiled hour on are dropped. Returns the number
+    of sensors that received statistics.
+    """
+    if "recorder" not in hass.config.components:
+        raise HomeAssistantError("Recorder is required to import statistics")
+
+    dev_id = device_id(vin)
+    ent_reg = entity_registry.async_get(hass)
+    recorder = get_instance(hass)
+    imported = 0
+
+    for description in STATISTICS_TYPES:
+        entity_id = ent_reg.async_get_entity_id(
+            "sensor", DOMAIN, f"{dev_id}_{description.key}"
+        )
+        if entity_id is None:
+            continue
+
+        # Rows must be in the unit the statistic already uses, otherwise the
+        # recorder flags a unit change and stops compiling the sensor
+        unit = _entity_unit(hass, ent_reg.async_get(entity_id), description)
+        convert = _unit_converter(description.native_unit_of_measurement, unit)
+        if convert is None:
+            _LOGGER.warning(
+                "Not importing statistics for %s, cannot convert %s to %s",
+                entity_id,
+                description.native_unit_of_measurement,
+                unit,
+            )
+            continue
+
+        points = _sample_points(description, samples, convert)
+        if not points:
+            continue
+
+        # The recorder compiles these hours itself
+        cutoff = await recorder.async_add_executor_job(
+            _import_cutoff, hass, entity_id
+        )
+        if points[-1][0] >= cutoff:
+            _LOGGER.warning(
+                "Not importing samples for %s from %s on, which are too recent",
+                entity_id,
+                cutoff,
+            )
+            points = [point for point in points if point[0] < cutoff]
+            if not points:
+                continue
+
+        # Rows already there hold the mean of the live states; importing
+        # would replace them
+        compiled = await recorder.async_add_executor_job(
+            _compiled_hours, hass, entity_id, _hour_start(points[0][0]), cutoff
+        )
+        statistics = [
+            row for row in _hourly_statistics(points) if row["start"] not in compiled
+        ]
+        if not statistics:
+            continue
+
+        metadata = {
+            "has_mean": True,
+            "has_sum": False,
+            "name": None,
+            "source": "recorder",
+            "statistic_id": entity_id,
+            "unit_of_measurement": unit,
+        }
+        async_import_statistics(hass, metadata, statistics)
+        imported += 1
+
+    _LOGGER.debug(
+        "Imported %s samples for %s into %s statistics", len(samples), dev_id, imported
+    )
+    return imported
+
+
+@callback
+def async_setup_services(hass: HomeAssistant):
+    """Register the Leaf Spy statistics import service."""
+
+    async def _import_statistics(call: ServiceCall):
+        """Handle an import_statistics service call."""
+        await async_import_samples(
+            hass, call.data[ATTR_VIN], call.data[ATTR_SAMPLES]
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_IMPORT_STATISTICS,
+        _import_statistics,
+        schema=IMPORT_STATISTICS_SCHEMA,
+    )
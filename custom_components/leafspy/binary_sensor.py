@@ -1,5 +1,6 @@
 """Binary sensor platform that adds support for Leaf Spy."""
 import logging
+import sys
 from dataclasses import dataclass, field
 from typing import Any, Callable
 
@@ -8,15 +9,16 @@ from homeassistant.components.binary_sensor import (
     BinarySensorEntity,
     BinarySensorEntityDescription,
 )
+from homeassistant.const import STATE_OFF, STATE_ON
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers import device_registry
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
-from homeassistant.util import slugify
 
 from .const import DOMAIN
+from .frame import device_id
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -43,8 +45,7 @@ async def async_setup_entry(
     discovery_info: DiscoveryInfoType | None = None
 ) -> bool:
     """Set up Leaf Spy binary sensors based on a config entry."""
-    if 'binary_sensors' not in hass.data[DOMAIN]:
-        hass.data[DOMAIN]['binary_sensors'] = {}
+    context = entry.runtime_data
 
     async def _process_message(context, message):
         """Process incoming sensor messages."""
@@ -53,7 +54,7 @@ async def async_setup_entry(
             if 'VIN' not in message:
                 return
 
-            dev_id = slugify(f'leaf_{message["VIN"]}')
+            dev_id = device_id(message['VIN'])
 
             # Create and update binary sensors for each description
             for description in BINARY_SENSOR_TYPES:
@@ -67,29 +68,28 @@ async def async_setup_entry(
                     _LOGGER.debug(f"Binary sensor {description.key}: Transformed value={value}")
 
                 if value is not None:
-                    sensor = hass.data[DOMAIN]['binary_sensors'].get(sensor_id)
-
-                    sensor_description = description
+                    sensor = context.binary_sensors.get(sensor_id)
 
                     if sensor is not None:
-                        sensor.entity_description = sensor_description
                         sensor.update_state(value)
                     else:
                         sensor = LeafSpyBinarySensor(dev_id, description, value)
-                        hass.data[DOMAIN]['binary_sensors'][sensor_id] = sensor
+                        context.binary_sensors[sensor_id] = sensor
                         async_add_entities([sensor])
 
-                        _LOGGER.debug(f"Registered sensor: {sensor.name} with initial value: {value}")
+                        _LOGGER.debug(f"Registered sensor: {sensor_id} with initial value: {value}")
 
         except Exception as err:
             _LOGGER.error("Error processing Leaf Spy message: %s", err)
 
-    async_dispatcher_connect(hass, DOMAIN, _process_message)
+    entry.async_on_unload(
+        async_dispatcher_connect(hass, DOMAIN, _process_message)
+    )
 
     # Restore previously loaded devices
     dev_reg = device_registry.async_get(hass)
     dev_ids = {
-        identifier[1]
+        sys.intern(identifier[1])
         for device in dev_reg.devices.values()
         for identifier in device.identifiers
         if identifier[0] == DOMAIN
@@ -98,14 +98,20 @@ async def async_setup_entry(
     if not dev_ids:
         return True
 
+    frames = context.store.frames
+
     entities = []
     for dev_id in dev_ids:
+        frame = frames.get(dev_id, {})
 
-        # For each device ID, recreate the sensor entities
+        # For each device ID, recreate the sensor entities from the snapshot
         for description in BINARY_SENSOR_TYPES:
             sensor_id = f"{dev_id}_{description.key}"
-            sensor = LeafSpyBinarySensor(dev_id, description, False)
-            hass.data[DOMAIN]['binary_sensors'][sensor_id] = sensor
+            value = frame.get(description.leafspy_key)
+            if value is not None:
+                value = description.transform_fn(value)
+            sensor = LeafSpyBinarySensor(dev_id, description, value)
+            context.binary_sensors[sensor_id] = sensor
             entities.append(sensor)
     async_add_entities(entities)
     return True
@@ -114,11 +120,13 @@ async def async_setup_entry(
 class LeafSpyBinarySensor(BinarySensorEntity, RestoreEntity):
     """Representation of a Leaf Spy binary sensor."""
 
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
     def __init__(self, device_id: str, description: LeafSpyBinarySensorDescription, initial_value):
         """Initialize the binary sensor."""
         self._device_id = device_id
         self._value = initial_value
-        self._attr_has_entity_name = True
         self.entity_description = description
 
     @property
@@ -144,12 +152,6 @@ class LeafSpyBinarySensor(BinarySensorEntity, RestoreEntity):
             "identifiers": {(DOMAIN, self._device_id)},
         }
     
-    @property
-    def should_poll(self) -> bool:
-        """Disable polling for this sensor."""
-        return False
-
-
     def update_state(self, new_value):
         """Update the binary sensor state."""
         self._value = new_value
@@ -158,15 +160,14 @@ class LeafSpyBinarySensor(BinarySensorEntity, RestoreEntity):
     async def async_added_to_hass(self):
         """Restore last known state."""
         await super().async_added_to_hass()
-        
+
+        # Restored from the device snapshot already
+        if self._value is not None:
+            return
+
+        # Fall back to the entity's own state for devices that have not
+        # reported since the snapshot store was introduced
         last_state = await self.async_get_last_state()
-        _LOGGER.debug(f"Last_state: {last_state}")
-
-        # if last_state:
-        #     try:
-        #         self._value = last_state.state
-        #     except (ValueError, TypeError):
-        #         _LOGGER.warning(f"Could not restore state for {self.name}")
-        
-        # Add this log line to confirm the method is being called
-        _LOGGER.debug(f"async_added_to_hass called for {self.name}")
+        if last_state and last_state.state in (STATE_ON, STATE_OFF):
+            _LOGGER.debug(f"Restored state for {self.name}: {last_state.state}")
+            self._value = last_state.state == STATE_ON
@@ -2,10 +2,32 @@
 import re
 import secrets
 
+import voluptuous as vol
+
 from homeassistant import config_entries
+from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.network import get_url
 
-from .const import URL_LEAFSPY_PATH, CONF_SECRET, DOMAIN
+from .const import (
+    URL_LEAFSPY_PATH,
+    CONF_DEADBAND,
+    CONF_ENABLED_GROUPS,
+    CONF_GPS_MIN_DISTANCE,
+    CONF_MQTT_BATCH_WINDOW,
+    CONF_MQTT_TOPIC,
+    CONF_QUEUE_SIZE,
+    CONF_SECRET,
+    CONF_WRITE_INTERVAL,
+    DEFAULT_DEADBAND,
+    DEFAULT_GPS_MIN_DISTANCE,
+    DEFAULT_MQTT_BATCH_WINDOW,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_WRITE_INTERVAL,
+    DOMAIN,
+    SENSOR_GROUPS,
+)
+from .pipeline import group_option
 
 
 class LeafSpyFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -14,6 +36,12 @@ class LeafSpyFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_PUSH
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow for this handler."""
+        return LeafSpyOptionsFlow(config_entry)
+
     async def async_step_user(self, user_input=None):
         """Handle a user initiated set up flow to create Leaf Spy webhook."""
         if self._async_current_entries():
@@ -41,3 +69,82 @@ class LeafSpyFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 'docs_url': 'https://www.home-assistant.io/components/leafspy/'
             }
         )
+
+
+class LeafSpyOptionsFlow(config_entries.OptionsFlow):
+    """Handle Leaf Spy options."""
+
+    def __init__(self, config_entry):
+        """Initialize the options flow."""
+        # Kept here, Home Assistant only sets config_entry itself from 2024.11
+        self._entry = config_entry
+        self._options = {}
+
+    async def async_step_init(self, user_input=None):
+        """Manage the Leaf Spy options."""
+        if user_input is not None:
+            self._options = dict(user_input)
+            if not self._options[CONF_ENABLED_GROUPS]:
+                return self.async_create_entry(title="", data=self._options)
+            return await self.async_step_groups()
+
+        options = self._entry.options
+
+        return self.async_show_form(
+            step_id='init',
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_ENABLED_GROUPS,
+                        default=list(options.get(CONF_ENABLED_GROUPS, SENSOR_GROUPS)),
+                    ): cv.multi_select({group: group for group in SENSOR_GROUPS}),
+                    vol.Optional(
+                        CONF_GPS_MIN_DISTANCE,
+                        default=options.get(
+                            CONF_GPS_MIN_DISTANCE, DEFAULT_GPS_MIN_DISTANCE
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_QUEUE_SIZE,
+                        default=options.get(CONF_QUEUE_SIZE, DEFAULT_QUEUE_SIZE),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1000)),
+                    vol.Optional(
+                        CONF_MQTT_TOPIC,
+                        description={
+                            'suggested_value': options.get(CONF_MQTT_TOPIC)
+                        },
+                    ): str,
+                    vol.Optional(
+                        CONF_MQTT_BATCH_WINDOW,
+                        default=options.get(
+                            CONF_MQTT_BATCH_WINDOW, DEFAULT_MQTT_BATCH_WINDOW
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=3600)),
+                }
+            ),
+        )
+
+    async def async_step_groups(self, user_input=None):
+        """Manage the write interval and deadband of each enabled group."""
+        if user_input is not None:
+            self._options.update(user_input)
+            return self.async_create_entry(title="", data=self._options)
+
+        options = self._entry.options
+        schema = {}
+        for group in self._options[CONF_ENABLED_GROUPS]:
+            interval_key = group_option(group, CONF_WRITE_INTERVAL)
+            deadband_key = group_option(group, CONF_DEADBAND)
+            schema[
+                vol.Optional(
+                    interval_key,
+                    default=options.get(interval_key, DEFAULT_WRITE_INTERVAL),
+                )
+            ] = vol.All(vol.Coerce(float), vol.Range(min=0))
+            schema[
+                vol.Optional(
+                    deadband_key, default=options.get(deadband_key, DEFAULT_DEADBAND)
+                )
+            ] = vol.All(vol.Coerce(float), vol.Range(min=0))
+
+        return self.async_show_form(step_id='groups', data_schema=vol.Schema(schema))
@@ -2,3 +2,30 @@
 DOMAIN = 'leafspy'
 URL_LEAFSPY_PATH = "/api/leafspy/update"
 CONF_SECRET = 'secret'
+
+CONF_MQTT_TOPIC = 'mqtt_topic'
+CONF_MQTT_BATCH_WINDOW = 'mqtt_batch_window'
+DEFAULT_MQTT_BATCH_WINDOW = 0
+
+CONF_ENABLED_GROUPS = 'enabled_groups'
+CONF_GPS_MIN_DISTANCE = 'gps_min_distance'
+CONF_QUEUE_SIZE = 'queue_size'
+CONF_WRITE_INTERVAL = 'write_interval'
+CONF_DEADBAND = 'deadband'
+DEFAULT_GPS_MIN_DISTANCE = 0
+DEFAULT_QUEUE_SIZE = 20
+DEFAULT_WRITE_INTERVAL = 0
+DEFAULT_DEADBAND = 0
+
+GROUP_BATTERY = 'battery'
+GROUP_CHARGING = 'charging'
+GROUP_DRIVING = 'driving'
+GROUP_RANGE = 'range'
+GROUP_DIAGNOSTIC = 'diagnostic'
+SENSOR_GROUPS = (
+    GROUP_BATTERY,
+    GROUP_CHARGING,
+    GROUP_DRIVING,
+    GROUP_RANGE,
+    GROUP_DIAGNOSTIC,
+)
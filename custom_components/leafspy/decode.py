@@ -0,0 +1,44 @@
+"""Decoding of Leaf Spy frames into entity values."""
+import logging
+
+from .binary_sensor import BINARY_SENSOR_TYPES
+from .sensor import SENSOR_TYPES
+
+_LOGGER = logging.getLogger(__name__)
+
+DESCRIPTIONS = (*SENSOR_TYPES, *BINARY_SENSOR_TYPES)
+
+
+def decode_frame(message, keys=None) -> dict:
+    """Return the decoded values of a frame, keyed by entity key.
+
+    Values are the same ones the entities show. Keys the car did not send
+    are left out, and so is the password. If keys is given, only those
+    values are decoded.
+    """
+    decoded = {}
+    for description in DESCRIPTIONS:
+        if keys is not None and description.key not in keys:
+            continue
+        value = message.get(description.leafspy_key)
+        if value is None:
+            continue
+        try:
+            value = description.transform_fn(value)
+            if isinstance(value, str) and getattr(
+                description, 'native_unit_of_measurement', None
+            ):
+                value = float(value)
+            decoded[description.key] = value
+        except (ValueError, TypeError):
+            _LOGGER.debug("Could not decode %s=%s", description.leafspy_key, value)
+
+    for key, leafspy_key in (('latitude', 'Lat'), ('longitude', 'Long')):
+        if keys is not None and key not in keys:
+            continue
+        try:
+            decoded[key] = float(message[leafspy_key])
+        except (KeyError, ValueError, TypeError):
+            pass
+
+    return decoded
@@ -1,5 +1,7 @@
 """Device tracker platform that adds support for Leaf Spy."""
+from dataclasses import dataclass
 import logging
+import sys
 
 from homeassistant.core import callback
 from homeassistant.const import (
@@ -11,34 +13,56 @@ from homeassistant.components.device_tracker.const import SourceType
 from homeassistant.components.device_tracker.config_entry import (
     TrackerEntity
 )
-from homeassistant.util import slugify
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers import device_registry
+from homeassistant.util.location import distance
 from .const import DOMAIN as LS_DOMAIN
+from .frame import device_id
 
 _LOGGER = logging.getLogger(__name__)
 
+
+@dataclass(slots=True)
+class LeafSpyPosition:
+    """Last reported position of a car."""
+
+    latitude: float | None = None
+    longitude: float | None = None
+    battery_level: float | None = None
+
+
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up Leaf Spy based off an entry."""
+    context = entry.runtime_data
+
     async def _receive_data(dev_id, **data):
         """Receive set location."""
-        entity = hass.data[LS_DOMAIN]['devices'].get(dev_id)
+        entity = context.devices.get(dev_id)
+
+        position = LeafSpyPosition(**data)
 
         if entity is not None:
-            entity.update_data(data)
+            min_distance = context.options.gps_min_distance
+            if min_distance and entity.distance_to(position) < min_distance:
+                # Keep the last coordinates, but not a stale battery level
+                if position.battery_level == entity.battery_level:
+                    return
+                position.latitude = entity.latitude
+                position.longitude = entity.longitude
+            entity.update_data(position)
             return
 
-        entity = hass.data[LS_DOMAIN]['devices'][dev_id] = LeafSpyDeviceTracker(
-            dev_id, data
+        entity = context.devices[dev_id] = LeafSpyDeviceTracker(
+            dev_id, position
         )
         async_add_entities([entity])
 
-    hass.data[LS_DOMAIN]['context'].set_async_see(_receive_data)
+    context.set_async_see(_receive_data)
 
     # Restore previously loaded devices
     dev_reg = device_registry.async_get(hass)
     dev_ids = {
-        identifier[1]
+        sys.intern(identifier[1])
         for device in dev_reg.devices.values()
         for identifier in device.identifiers
         if identifier[0] == LS_DOMAIN
@@ -47,10 +71,21 @@ async def async_setup_entry(hass, entry, async_add_entities):
     if not dev_ids:
         return
 
+    frames = context.store.frames
+
     entities = []
     for dev_id in dev_ids:
-        entity = hass.data[LS_DOMAIN]['devices'][dev_id] = LeafSpyDeviceTracker(
-            dev_id
+        data = None
+        if dev_id in frames:
+            try:
+                data = _parse_see_args(frames[dev_id])
+                del data['dev_id']
+                data = LeafSpyPosition(**data)
+            except (KeyError, ValueError, TypeError):
+                _LOGGER.warning("Could not restore location for %s", dev_id)
+
+        entity = context.devices[dev_id] = LeafSpyDeviceTracker(
+            dev_id, data
         )
         entities.append(entity)
 
@@ -63,7 +98,7 @@ class LeafSpyDeviceTracker(TrackerEntity, RestoreEntity):
     def __init__(self, dev_id, data=None):
         """Set up LeafSpy entity."""
         self._dev_id = dev_id
-        self._data = data or {}
+        self._data = data
 
     @property
     def unique_id(self):
@@ -73,7 +108,7 @@ class LeafSpyDeviceTracker(TrackerEntity, RestoreEntity):
     @property
     def battery_level(self):
         """Return the battery level of the car."""
-        return self._data.get('battery_level')
+        return self._data.battery_level if self._data else None
         
     @property
     def icon(self):
@@ -83,12 +118,12 @@ class LeafSpyDeviceTracker(TrackerEntity, RestoreEntity):
     @property
     def latitude(self):
         """Return latitude value of the car."""
-        return self._data.get('latitude')
+        return self._data.latitude if self._data else None
 
     @property
     def longitude(self):
         """Return longitude value of the car."""
-        return self._data.get('longitude')
+        return self._data.longitude if self._data else None
 
     @property
     def name(self):
@@ -118,7 +153,7 @@ class LeafSpyDeviceTracker(TrackerEntity, RestoreEntity):
         await super().async_added_to_hass()
 
         # Don't restore if we got set up with data.
-        if self._data:
+        if self._data is not None:
             return
 
         state = await self.async_get_last_state()
@@ -127,15 +162,25 @@ class LeafSpyDeviceTracker(TrackerEntity, RestoreEntity):
             return
 
         attr = state.attributes
-        self._data = {
-            'device_name': state.name,
-            'latitude': attr.get(ATTR_LATITUDE),
-            'longitude': attr.get(ATTR_LONGITUDE),
-            'battery_level': attr.get(ATTR_BATTERY_LEVEL),
-        }
+        self._data = LeafSpyPosition(
+            latitude=attr.get(ATTR_LATITUDE),
+            longitude=attr.get(ATTR_LONGITUDE),
+            battery_level=attr.get(ATTR_BATTERY_LEVEL),
+        )
+
+    def distance_to(self, position: LeafSpyPosition):
+        """Return the distance in meters from the current position."""
+        if self._data is None or None in (self._data.latitude, self._data.longitude):
+            return float('inf')
+        return distance(
+            self._data.latitude,
+            self._data.longitude,
+            position.latitude,
+            position.longitude,
+        )
 
     @callback
-    def update_data(self, data):
+    def update_data(self, data: LeafSpyPosition):
         """Mark the device as seen."""
         self._data = data
         self.async_write_ha_state()
@@ -143,9 +188,8 @@ class LeafSpyDeviceTracker(TrackerEntity, RestoreEntity):
 
 def _parse_see_args(message):
     """Parse the Leaf Spy parameters, into the format see expects."""
-    dev_id = slugify('leaf_{}'.format(message['VIN']))
     args = {
-        'dev_id': dev_id,
+        'dev_id': device_id(message['VIN']),
         'latitude': float(message['Lat']),
         'longitude': float(message['Long']),
         'battery_level': float(message['SOC'])
@@ -0,0 +1,120 @@
+"""Parsing of Leaf Spy uploads."""
+from functools import cache
+import sys
+from urllib.parse import unquote_plus
+
+from homeassistant.util import slugify
+
+# Every query key the integration reads. Anything else Leaf Spy sends is
+# skipped without being decoded.
+LEAFSPY_KEYS = (
+    'pass',
+    'VIN',
+    'Lat',
+    'Long',
+    'Elv',
+    'Seq',
+    'Trip',
+    'Odo',
+    'SOC',
+    'AHr',
+    'BatTemp',
+    'Amb',
+    'Wpr',
+    'PlugState',
+    'ChrgMode',
+    'ChrgPwr',
+    'PwrSw',
+    'Gids',
+    'SOH',
+    'Hx',
+    'Speed',
+    'BatVolts',
+    'BatAmps',
+    'RPM',
+    'DevBat',
+)
+
+_KEYS = frozenset(LEAFSPY_KEYS)
+
+
+class LeafSpyFrame:
+    """A single Leaf Spy upload, holding only the keys we know about.
+
+    Behaves like the read-only mapping the platforms used to receive, so
+    ``frame.get('SOC')``, ``frame['VIN']`` and ``'VIN' in frame`` all work.
+    """
+
+    __slots__ = LEAFSPY_KEYS
+
+    def get(self, key, default=None):
+        """Return the raw value of a key, or default if it was not sent."""
+        if key not in _KEYS:
+            return default
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        """Return the raw value of a key."""
+        if key not in _KEYS:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        """Return if the key was sent."""
+        return key in _KEYS and hasattr(self, key)
+
+    def items(self):
+        """Return the keys that were sent along with their values."""
+        return [
+            (key, getattr(self, key)) for key in LEAFSPY_KEYS if hasattr(self, key)
+        ]
+
+    def __repr__(self):
+        """Return the representation of the frame, without the password."""
+        values = ", ".join(
+            f"{key}={value}" for key, value in self.items() if key != 'pass'
+        )
+        return f"<LeafSpyFrame {values}>"
+
+
+def parse_query(query_string: str) -> LeafSpyFrame:
+    """Parse a raw, still URL-encoded query string into a frame.
+
+    The string is scanned once. Unknown keys are dropped before their value
+    is looked at and known values are only unquoted when they need it. When
+    a key is repeated the first value wins, as with ``request.query``.
+    """
+    values = {}
+    for pair in query_string.split('&'):
+        key, _, value = pair.partition('=')
+        if key in _KEYS and key not in values:
+            values[key] = value
+
+    frame = LeafSpyFrame()
+    for key, value in values.items():
+        if '%' in value or '+' in value:
+            value = unquote_plus(value)
+        setattr(frame, key, value)
+    return frame
+
+
+def float_value(message, key):
+    """Return a value of a frame as a float, or None."""
+    try:
+        return float(message.get(key))
+    except (ValueError, TypeError):
+        return None
+
+
+@cache
+def device_id(vin: str) -> str:
+    """Return the device id for a VIN.
+
+    The result is interned and cached without a size limit, so every entity
+    and record of a car shares one string and slugify only runs once per car,
+    however many cars upload.
+    """
+    return sys.intern(slugify(f'leaf_{vin}'))
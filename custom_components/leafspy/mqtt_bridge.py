@@ -0,0 +1,82 @@
+"""Republish decoded Leaf Spy frames to MQTT."""
+import logging
+
+from homeassistant.components import mqtt
+from homeassistant.core import callback, HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.json import json_dumps
+
+from .const import DOMAIN
+from .decode import decode_frame
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LeafSpyMqttBridge:
+    """Publish every decoded frame once, as one JSON payload per VIN.
+
+    With a batch window, frames are collected per VIN and published as a
+    JSON list when the window closes. ``publish`` defaults to Home
+    Assistant's MQTT publish and can be swapped for a broker stand-in.
+    """
+
+    def __init__(self, hass: HomeAssistant, topic, batch_window=0, publish=None):
+        """Initialize the bridge."""
+        self.hass = hass
+        self.topic = topic.rstrip('/')
+        self.batch_window = batch_window
+        self._publish = publish or mqtt.async_publish
+        self._pending = {}
+        self._unsub_dispatcher = None
+        self._unsub_timer = None
+
+    @callback
+    def async_start(self):
+        """Start listening for frames."""
+        self._unsub_dispatcher = async_dispatcher_connect(
+            self.hass, DOMAIN, self.async_handle_message
+        )
+
+    async def async_stop(self):
+        """Stop listening and publish the frames still waiting for the window."""
+        if self._unsub_dispatcher is not None:
+            self._unsub_dispatcher()
+            self._unsub_dispatcher = None
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        await self._async_flush()
+
+    async def async_handle_message(self, context, message):
+        """Handle a Leaf Spy message."""
+        if 'VIN' not in message:
+            return
+
+        vin = message['VIN']
+        payload = decode_frame(message)
+
+        if not self.batch_window:
+            await self._async_publish(vin, payload)
+            return
+
+        self._pending.setdefault(vin, []).append(payload)
+        if self._unsub_timer is None:
+            self._unsub_timer = async_call_later(
+                self.hass, self.batch_window, self._async_flush
+            )
+
+    async def _async_flush(self, _now=None):
+        """Publish the frames collected during the batch window."""
+        self._unsub_timer = None
+        pending, self._pending = self._pending, {}
+        for vin, payloads in pending.items():
+            await self._async_publish(vin, payloads)
+
+    async def _async_publish(self, vin, payload):
+        """Publish a payload on the topic of a VIN."""
+        try:
+            await self._publish(self.hass, f"{self.topic}/{vin}", json_dumps(payload))
+        except HomeAssistantError as err:
+            _LOGGER.warning("Could not publish Leaf Spy frame for %s: %s", vin, err)
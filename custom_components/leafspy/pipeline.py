@@ -0,0 +1,159 @@
+"""Runtime state and tunable settings of the Leaf Spy message pipeline."""
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import logging
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import callback, HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .const import (
+    CONF_DEADBAND,
+    CONF_ENABLED_GROUPS,
+    CONF_GPS_MIN_DISTANCE,
+    CONF_QUEUE_SIZE,
+    CONF_WRITE_INTERVAL,
+    DEFAULT_DEADBAND,
+    DEFAULT_GPS_MIN_DISTANCE,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_WRITE_INTERVAL,
+    DOMAIN,
+    SENSOR_GROUPS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def group_option(group, option):
+    """Return the options key of a per-group setting."""
+    return f"{group}_{option}"
+
+
+@dataclass(slots=True, frozen=True)
+class PipelineOptions:
+    """Pipeline settings, built from the options of the config entry."""
+
+    enabled_groups: frozenset
+    write_intervals: dict
+    deadbands: dict
+    gps_min_distance: float
+    queue_size: int
+
+    @classmethod
+    def from_options(cls, options):
+        """Create the settings from config entry options."""
+        return cls(
+            enabled_groups=frozenset(
+                options.get(CONF_ENABLED_GROUPS, SENSOR_GROUPS)
+            ),
+            write_intervals={
+                group: options.get(
+                    group_option(group, CONF_WRITE_INTERVAL), DEFAULT_WRITE_INTERVAL
+                )
+                for group in SENSOR_GROUPS
+            },
+            deadbands={
+                group: options.get(group_option(group, CONF_DEADBAND), DEFAULT_DEADBAND)
+                for group in SENSOR_GROUPS
+            },
+            gps_min_distance=options.get(
+                CONF_GPS_MIN_DISTANCE, DEFAULT_GPS_MIN_DISTANCE
+            ),
+            queue_size=int(options.get(CONF_QUEUE_SIZE, DEFAULT_QUEUE_SIZE)),
+        )
+
+    def write_interval(self, group):
+        """Return the minimum seconds between state writes of a group."""
+        return self.write_intervals.get(group, DEFAULT_WRITE_INTERVAL)
+
+    def deadband(self, group):
+        """Return the change a numeric value of a group needs to be written."""
+        return self.deadbands.get(group, DEFAULT_DEADBAND)
+
+
+class LeafSpyContext:
+    """Hold the runtime state of a Leaf Spy config entry.
+
+    Stored as the entry's runtime_data, so everything here goes away with
+    the entry. Listeners are registered with the entry's async_on_unload,
+    which keeps the work per upload the same across reloads.
+    """
+
+    def __init__(self, hass, secret, store, options):
+        """Initialize a Leaf Spy context."""
+        self.hass = hass
+        self.secret = secret
+        self.store = store
+        self.options = options
+        self.range_estimator = None
+        self.trip_recorder = None
+        self.mqtt_bridge = None
+        self.devices = {}
+        self.sensors = {}
+        self.binary_sensors = {}
+        self._pending_msg = []
+        self._queue = deque(maxlen=options.queue_size)
+        self._queue_event = asyncio.Event()
+
+    @callback
+    def async_apply_options(self, options):
+        """Switch the pipeline to new settings."""
+        if options.queue_size != self.options.queue_size:
+            self._queue = deque(self._queue, maxlen=options.queue_size)
+        self.options = options
+        for sensor in self.sensors.values():
+            sensor.async_set_available(
+                sensor.entity_description.group in options.enabled_groups
+            )
+
+    @callback
+    def async_enqueue(self, message):
+        """Queue an upload to be dispatched."""
+        if len(self._queue) == self._queue.maxlen:
+            _LOGGER.warning("Leaf Spy queue is full, dropping the oldest upload")
+        self._queue.append(message)
+        self._queue_event.set()
+
+    @callback
+    def async_stop(self):
+        """Stop dispatching, dropping uploads that are still queued.
+
+        Every listener is fed from this queue, so none of them runs or
+        touches the store after this.
+        """
+        if self._queue:
+            _LOGGER.debug("Dropping %s queued Leaf Spy uploads", len(self._queue))
+        self._queue.clear()
+
+    async def async_process_queue(self):
+        """Dispatch queued uploads in the order they arrived."""
+        while True:
+            await self._queue_event.wait()
+            self._queue_event.clear()
+            while self._queue:
+                async_dispatcher_send(self.hass, DOMAIN, self, self._queue.popleft())
+                await asyncio.sleep(0)
+
+    @callback
+    def set_async_see(self, func):
+        """Set a new async_see function."""
+        self.async_see = func
+        for msg in self._pending_msg:
+            func(**msg)
+        self._pending_msg.clear()
+
+    # pylint: disable=method-hidden
+    @callback
+    def async_see(self, **data):
+        """Send a see message to the device tracker."""
+        self._pending_msg.append(data)
+
+
+@callback
+def async_get_context(hass: HomeAssistant):
+    """Return the context of the loaded Leaf Spy entry, if any."""
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry.state is ConfigEntryState.LOADED:
+            return entry.runtime_data
+    return None
@@ -0,0 +1,218 @@
+"""Per-car range estimation learned from the Leaf Spy message stream."""
+import logging
+
+from homeassistant.core import callback, HomeAssistant
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
+)
+
+from .const import DOMAIN
+from .frame import device_id, float_value
+
+_LOGGER = logging.getLogger(__name__)
+
+SIGNAL_RANGE_UPDATE = f"{DOMAIN}_range_update"
+
+# Energy of one Gid, as used by Leaf Spy
+WH_PER_GID = 77.5
+# Pack voltage used to turn the Ah capacity into energy
+NOMINAL_VOLTAGE = 360
+# Used to take elevation changes out of the learned consumption
+VEHICLE_MASS_KG = 1600
+WH_PER_METER_CLIMB = VEHICLE_MASS_KG * 9.81 / 3600
+
+# Upper bin edges; one more bin catches everything above the last edge
+SPEED_BINS_KMH = (20, 40, 60, 80, 100, 120)
+TEMP_BINS_C = (0, 10, 20, 30)
+BIN_COUNT = (len(SPEED_BINS_KMH) + 1) * (len(TEMP_BINS_C) + 1)
+
+# Distance a bin needs before it is trusted over the overall average
+MIN_BIN_KM = 5
+# Steps longer than this are gaps in the data, not driving
+MAX_STEP_KM = 5
+DEFAULT_WH_PER_KM = 150
+MIN_WH_PER_KM = 50
+
+
+def _bin_index(edges, value):
+    """Return the histogram bin a value falls in."""
+    for index, edge in enumerate(edges):
+        if value < edge:
+            return index
+    return len(edges)
+
+
+def _histogram_bin(speed_kmh, temperature):
+    """Return the flat index of the speed/temperature bin."""
+    return (
+        _bin_index(SPEED_BINS_KMH, speed_kmh) * (len(TEMP_BINS_C) + 1)
+        + _bin_index(TEMP_BINS_C, temperature)
+    )
+
+
+def _speed_and_temperature(message):
+    """Return the speed in km/h and ambient temperature of a frame."""
+    speed = float_value(message, 'Speed') or 0
+    return speed * 3.6, float_value(message, 'Amb') or 0
+
+
+class ConsumptionModel:
+    """Energy and distance histograms of one car, binned by speed and temperature."""
+
+    __slots__ = ('energy', 'distance', 'anchor')
+
+    def __init__(self, energy=None, distance=None):
+        """Initialize the model."""
+        self.energy = energy or [0.0] * BIN_COUNT
+        self.distance = distance or [0.0] * BIN_COUNT
+        # (odometer, gids, elevation) of the last point distance was counted
+        # from, then the mean speed and temperature of the frames since and
+        # their count
+        self.anchor = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create a model from its stored form."""
+        energy = data.get('energy')
+        distance = data.get('distance')
+        if len(energy or ()) != BIN_COUNT or len(distance or ()) != BIN_COUNT:
+            return cls()
+        return cls(energy, distance)
+
+    def as_dict(self):
+        """Return the stored form of the model."""
+        return {'energy': self.energy, 'distance': self.distance}
+
+    def update(self, message):
+        """Learn from a frame."""
+        odometer = float_value(message, 'Odo')
+        gids = float_value(message, 'Gids')
+        if odometer is None or gids is None:
+            return
+
+        elevation = float_value(message, 'Elv')
+        speed, temperature = _speed_and_temperature(message)
+        charging = (
+            message.get('PlugState', '0') != '0'
+            or message.get('ChrgMode', '0') != '0'
+        )
+        if charging or self.anchor is None:
+            self.anchor = (
+                None if charging else (odometer, gids, elevation, speed, temperature, 1)
+            )
+            return
+
+        (
+            last_odometer,
+            last_gids,
+            last_elevation,
+            mean_speed,
+            mean_temperature,
+            frames,
+        ) = self.anchor
+        step_km = odometer - last_odometer
+
+        # The step is binned by its average conditions, not those of the
+        # frame where the odometer happened to tick
+        frames += 1
+        mean_speed += (speed - mean_speed) / frames
+        mean_temperature += (temperature - mean_temperature) / frames
+
+        # The odometer only moves in whole km, so keep the anchor until it does
+        if step_km == 0:
+            self.anchor = (
+                last_odometer,
+                last_gids,
+                last_elevation,
+                mean_speed,
+                mean_temperature,
+                frames,
+            )
+            return
+
+        self.anchor = (odometer, gids, elevation, speed, temperature, 1)
+
+        if not 0 < step_km <= MAX_STEP_KM:
+            return
+
+        energy = (last_gids - gids) * WH_PER_GID
+        if elevation is not None and last_elevation is not None:
+            energy -= (elevation - last_elevation) * WH_PER_METER_CLIMB
+
+        index = _histogram_bin(mean_speed, mean_temperature)
+        self.energy[index] += energy
+        self.distance[index] += step_km
+
+    def consumption(self, speed_kmh, temperature):
+        """Return the expected consumption in Wh/km."""
+        index = _histogram_bin(speed_kmh, temperature)
+        if speed_kmh > 0 and self.distance[index] >= MIN_BIN_KM:
+            wh_per_km = self.energy[index] / self.distance[index]
+        else:
+            total_distance = sum(self.distance)
+            if total_distance >= MIN_BIN_KM:
+                wh_per_km = sum(self.energy) / total_distance
+            else:
+                wh_per_km = DEFAULT_WH_PER_KM
+        return max(wh_per_km, MIN_WH_PER_KM)
+
+    def estimate(self, message):
+        """Return the range and time to full for a frame."""
+        estimate = {'estimated_range': None, 'time_to_full': None}
+
+        gids = float_value(message, 'Gids')
+        if gids is not None:
+            consumption = self.consumption(*_speed_and_temperature(message))
+            estimate['estimated_range'] = round(gids * WH_PER_GID / consumption, 1)
+
+        capacity = float_value(message, 'AHr')
+        state_of_charge = float_value(message, 'SOC')
+        charge_power = float_value(message, 'ChrgPwr')
+        if capacity and state_of_charge is not None and charge_power:
+            missing_wh = (
+                capacity * NOMINAL_VOLTAGE * max(100 - state_of_charge, 0) / 100
+            )
+            estimate['time_to_full'] = round(missing_wh / charge_power * 60)
+
+        return estimate
+
+
+class LeafSpyRangeEstimator:
+    """Keep a consumption model for every car and publish estimates."""
+
+    def __init__(self, hass: HomeAssistant, store):
+        """Initialize the estimator."""
+        self.hass = hass
+        self.store = store
+
+    def model(self, dev_id):
+        """Return the model of a car, creating it if needed."""
+        model = self.store.range_models.get(dev_id)
+        if model is None:
+            model = self.store.range_models[dev_id] = ConsumptionModel()
+        return model
+
+    def estimate(self, dev_id, message):
+        """Return the estimate of a car for a frame."""
+        return self.model(dev_id).estimate(message)
+
+    @callback
+    def async_start(self):
+        """Start listening for frames."""
+        return async_dispatcher_connect(self.hass, DOMAIN, self.async_handle_message)
+
+    @callback
+    def async_handle_message(self, context, message):
+        """Learn from a frame and publish the new estimate."""
+        if 'VIN' not in message:
+            return
+
+        dev_id = device_id(message['VIN'])
+        model = self.model(dev_id)
+        model.update(message)
+        self.store.async_schedule_save()
+
+        async_dispatcher_send(
+            self.hass, SIGNAL_RANGE_UPDATE, dev_id, model.estimate(message)
+        )
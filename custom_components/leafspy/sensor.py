@@ -1,6 +1,9 @@
 """Sensor platform that adds support for Leaf Spy."""
 import logging
+import sys
+import time
 from dataclasses import dataclass, field, replace
+from functools import partial
 from typing import Any, Callable
 
 from homeassistant.components.sensor import (
@@ -17,16 +20,26 @@ from homeassistant.const import (
     UnitOfPower,
     UnitOfSpeed,
     UnitOfTemperature,
+    UnitOfTime,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import callback, HomeAssistant
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers import device_registry
 from homeassistant.components.sensor import SensorEntityDescription
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
-from homeassistant.util import slugify
 
-from .const import DOMAIN
+from .const import (
+    DOMAIN,
+    GROUP_BATTERY,
+    GROUP_CHARGING,
+    GROUP_DIAGNOSTIC,
+    GROUP_DRIVING,
+    GROUP_RANGE,
+)
+from .frame import device_id
+from .range_model import SIGNAL_RANGE_UPDATE
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -35,6 +48,7 @@ class LeafSpySensorDescription(SensorEntityDescription):
     """Describes Leaf Spy sensor."""
     transform_fn: Callable[[dict], Any] = field(default=lambda x: x)
     leafspy_key: str = field(default=None)
+    group: str = field(default=GROUP_DIAGNOSTIC)
 
 def _safe_round(x, digits=2):
     try:
@@ -59,6 +73,7 @@ def _transform_hx(x):
 SENSOR_TYPES = [
     LeafSpySensorDescription(
         key="ambient_temperature",
+        group=GROUP_DRIVING,
         leafspy_key="Amb",
         native_unit_of_measurement=UnitOfTemperature.CELSIUS,
         device_class=SensorDeviceClass.TEMPERATURE,
@@ -67,6 +82,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="battery_capacity",
+        group=GROUP_BATTERY,
         leafspy_key="AHr",
         state_class=SensorStateClass.MEASUREMENT,
         transform_fn=lambda x: _safe_round(x, 2),
@@ -75,6 +91,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="battery_conductance",
+        group=GROUP_BATTERY,
         leafspy_key="Hx",
         native_unit_of_measurement=PERCENTAGE,
         state_class=SensorStateClass.MEASUREMENT,
@@ -83,6 +100,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="battery_current",
+        group=GROUP_BATTERY,
         leafspy_key="BatAmps",
         native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
         device_class=SensorDeviceClass.CURRENT,
@@ -90,6 +108,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="battery_health",
+        group=GROUP_BATTERY,
         leafspy_key="SOH",
         native_unit_of_measurement=PERCENTAGE,
         state_class=SensorStateClass.MEASUREMENT,
@@ -97,6 +116,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="battery_state_of_charge",
+        group=GROUP_BATTERY,
         leafspy_key="SOC",
         native_unit_of_measurement=PERCENTAGE,
         device_class=SensorDeviceClass.BATTERY,
@@ -105,6 +125,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="battery_gids",
+        group=GROUP_BATTERY,
         leafspy_key="Gids",
         native_unit_of_measurement="Gids",
         state_class=SensorStateClass.MEASUREMENT,
@@ -112,6 +133,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="battery_temperature",
+        group=GROUP_BATTERY,
         leafspy_key="BatTemp",
         native_unit_of_measurement=UnitOfTemperature.CELSIUS,
         device_class=SensorDeviceClass.TEMPERATURE,
@@ -119,6 +141,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="battery_voltage",
+        group=GROUP_BATTERY,
         leafspy_key="BatVolts",
         native_unit_of_measurement=UnitOfElectricPotential.VOLT,
         device_class=SensorDeviceClass.VOLTAGE,
@@ -127,6 +150,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="charge_mode",
+        group=GROUP_CHARGING,
         leafspy_key="ChrgMode",
         device_class=SensorDeviceClass.ENUM,
         transform_fn=lambda x: {
@@ -146,6 +170,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="charge_power",
+        group=GROUP_CHARGING,
         leafspy_key="ChrgPwr",
         native_unit_of_measurement=UnitOfPower.WATT,
         device_class=SensorDeviceClass.POWER,
@@ -153,6 +178,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="elevation",
+        group=GROUP_DRIVING,
         leafspy_key="Elv",
         native_unit_of_measurement=UnitOfLength.METERS,
         device_class=SensorDeviceClass.DISTANCE,
@@ -162,6 +188,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="front_wiper",
+        group=GROUP_DRIVING,
         leafspy_key="Wpr",
         device_class=SensorDeviceClass.ENUM,
         transform_fn=lambda x: {
@@ -183,6 +210,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="motor_speed",
+        group=GROUP_DRIVING,
         leafspy_key="RPM",
         native_unit_of_measurement="RPM",
         state_class=SensorStateClass.MEASUREMENT,
@@ -190,6 +218,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="odometer",
+        group=GROUP_DRIVING,
         leafspy_key="Odo",
         native_unit_of_measurement=UnitOfLength.KILOMETERS,
         device_class=SensorDeviceClass.DISTANCE,
@@ -199,6 +228,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="phone_battery",
+        group=GROUP_DIAGNOSTIC,
         leafspy_key="DevBat",
         native_unit_of_measurement=PERCENTAGE,
         device_class=SensorDeviceClass.BATTERY,
@@ -206,6 +236,7 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="plug_state",
+        group=GROUP_CHARGING,
         leafspy_key="PlugState",
         device_class=SensorDeviceClass.ENUM,
         transform_fn=lambda x: {
@@ -223,11 +254,13 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="sequence_number",
+        group=GROUP_DIAGNOSTIC,
         leafspy_key="Seq",
         icon="mdi:numeric",
     ),
     LeafSpySensorDescription(
         key="speed",
+        group=GROUP_DRIVING,
         leafspy_key="Speed",
         native_unit_of_measurement=UnitOfSpeed.METERS_PER_SECOND,
         device_class=SensorDeviceClass.SPEED,
@@ -235,16 +268,55 @@ SENSOR_TYPES = [
     ),
     LeafSpySensorDescription(
         key="trip_number",
+        group=GROUP_DRIVING,
         leafspy_key="Trip",
         icon="mdi:road-variant",
     ),
     LeafSpySensorDescription(
         key="vin",
+        group=GROUP_DIAGNOSTIC,
         leafspy_key="VIN",
         icon="mdi:identifier",
     ),
 ]
 
+# Sensors computed by the range estimator rather than read from a message
+RANGE_SENSOR_TYPES = [
+    LeafSpySensorDescription(
+        key="estimated_range",
+        group=GROUP_RANGE,
+        native_unit_of_measurement=UnitOfLength.KILOMETERS,
+        device_class=SensorDeviceClass.DISTANCE,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:map-marker-distance",
+    ),
+    LeafSpySensorDescription(
+        key="time_to_full",
+        group=GROUP_RANGE,
+        native_unit_of_measurement=UnitOfTime.MINUTES,
+        device_class=SensorDeviceClass.DURATION,
+        icon="mdi:battery-clock",
+    ),
+]
+
+def _within_deadband(old, new, deadband):
+    """Return if a numeric value moved less than the deadband."""
+    try:
+        return abs(float(new) - float(old)) < deadband
+    except (ValueError, TypeError):
+        return False
+
+def _restore_value(description, frame):
+    """Return the sensor value held in a stored frame, if any."""
+    value = frame.get(description.leafspy_key)
+    if value is None:
+        return None
+    try:
+        return description.transform_fn(value)
+    except (ValueError, TypeError):
+        _LOGGER.warning(f"Could not restore state for {description.key}")
+        return None
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigType,
@@ -252,8 +324,7 @@ async def async_setup_entry(
     discovery_info: DiscoveryInfoType | None = None
 ) -> bool:
     """Set up Leaf Spy sensors based on a config entry."""
-    if 'sensors' not in hass.data[DOMAIN]:
-        hass.data[DOMAIN]['sensors'] = {}
+    context = entry.runtime_data
 
     async def _process_message(context, message):
         """Process incoming sensor messages."""
@@ -261,12 +332,17 @@ async def async_setup_entry(
             if 'VIN' not in message:
                 return
 
-            dev_id = slugify(f'leaf_{message["VIN"]}')
+            dev_id = device_id(message['VIN'])
 
             _LOGGER.debug(f"Incoming message: {message}")
 
+            options = context.options
+
             # Create and update sensors for each description
             for description in SENSOR_TYPES:
+                if description.group not in options.enabled_groups:
+                    continue
+
                 sensor_id = f"{dev_id}_{description.key}"
                 value = message.get(description.leafspy_key, None)
 
@@ -277,33 +353,63 @@ async def async_setup_entry(
                     _LOGGER.debug(f"Sensor {description.key}: Transformed value={value}")
 
                 if value is not None:
-                    sensor = hass.data[DOMAIN]['sensors'].get(sensor_id)
-                    
-                    sensor_description = description
+                    sensor = context.sensors.get(sensor_id)
 
                     if sensor is not None:
                         # Update existing sensor
-                        sensor.entity_description = sensor_description
-                        sensor.update_state(value)
+                        sensor.update_state(
+                            value,
+                            options.write_interval(description.group),
+                            options.deadband(description.group),
+                        )
                     else:
                         # Add a new sensor
-                        sensor = LeafSpySensor(dev_id, sensor_description, value)
-                        hass.data[DOMAIN]['sensors'][sensor_id] = sensor
+                        sensor = LeafSpySensor(dev_id, description, value)
+                        context.sensors[sensor_id] = sensor
                         async_add_entities([sensor])
 
                         # Add a log to confirm the sensor is being registered
-                        _LOGGER.debug(f"Registered sensor: {sensor.name} with initial value: {value}")
+                        _LOGGER.debug(f"Registered sensor: {sensor_id} with initial value: {value}")
 
         except Exception as err:
             _LOGGER.error("Error processing Leaf Spy message: %s", err)
             _LOGGER.exception("Full traceback")
 
-    async_dispatcher_connect(hass, DOMAIN, _process_message)
-    
+    entry.async_on_unload(
+        async_dispatcher_connect(hass, DOMAIN, _process_message)
+    )
+
+    async def _process_range(dev_id, estimate):
+        """Process range estimates."""
+        options = context.options
+
+        for description in RANGE_SENSOR_TYPES:
+            if description.group not in options.enabled_groups:
+                continue
+
+            sensor_id = f"{dev_id}_{description.key}"
+            value = estimate.get(description.key)
+            sensor = context.sensors.get(sensor_id)
+
+            if sensor is not None:
+                sensor.update_state(
+                    value,
+                    options.write_interval(description.group),
+                    options.deadband(description.group),
+                )
+            elif value is not None:
+                sensor = LeafSpySensor(dev_id, description, value)
+                context.sensors[sensor_id] = sensor
+                async_add_entities([sensor])
+
+    entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_RANGE_UPDATE, _process_range)
+    )
+
     # Restore previously loaded sensors
     dev_reg = device_registry.async_get(hass)
     dev_ids = {
-        identifier[1]
+        sys.intern(identifier[1])
         for device in dev_reg.devices.values()
         for identifier in device.identifiers
         if identifier[0] == DOMAIN
@@ -312,13 +418,30 @@ async def async_setup_entry(
     if not dev_ids:
         return True
 
+    frames = context.store.frames
+    enabled_groups = context.options.enabled_groups
+
     entities = []
     for dev_id in dev_ids:
-        # For each device ID, recreate the sensor entities
+        frame = frames.get(dev_id, {})
+
+        # For each device ID, recreate the sensor entities from the snapshot
         for description in SENSOR_TYPES:
+            if description.group not in enabled_groups:
+                continue
             sensor_id = f"{dev_id}_{description.key}"
-            sensor = LeafSpySensor(dev_id, description, None)  # Initializing with None
-            hass.data[DOMAIN]['sensors'][sensor_id] = sensor
+            value = _restore_value(description, frame)
+            sensor = LeafSpySensor(dev_id, description, value)
+            context.sensors[sensor_id] = sensor
+            entities.append(sensor)
+
+        estimate = context.range_estimator.estimate(dev_id, frame)
+        for description in RANGE_SENSOR_TYPES:
+            if description.group not in enabled_groups:
+                continue
+            sensor_id = f"{dev_id}_{description.key}"
+            sensor = LeafSpySensor(dev_id, description, estimate[description.key])
+            context.sensors[sensor_id] = sensor
             entities.append(sensor)
 
     async_add_entities(entities)
@@ -329,11 +452,16 @@ async def async_setup_entry(
 class LeafSpySensor(RestoreSensor):
     """Representation of a Leaf Spy sensor."""
 
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
     def __init__(self, device_id: str, description: LeafSpySensorDescription, initial_value):
         """Initialize the sensor."""
         self._device_id = device_id
         self._value = initial_value
-        self._attr_has_entity_name = True
+        self._written_value = initial_value
+        self._written_at = None
+        self._cancel_flush = None
         self.entity_description = description
 
     @property
@@ -359,30 +487,81 @@ class LeafSpySensor(RestoreSensor):
             "identifiers": {(DOMAIN, self._device_id)},
         }
     
-    @property
-    def should_poll(self) -> bool:
-        """Disable polling for this sensor."""
-        return False
-
-    def update_state(self, new_value):
-        """Update the sensor state."""
+    def update_state(self, new_value, write_interval=0, deadband=0):
+        """Update the sensor state.
+
+        The state is only written once write_interval seconds have passed
+        since the last write, and, for numbers, when it moved by at least
+        deadband from the last written value. A value held back by the
+        interval is written when the interval has passed.
+        """
         self._value = new_value
+
+        if self._written_at is not None:
+            remaining = write_interval - (time.monotonic() - self._written_at)
+            if remaining > 0:
+                if self._cancel_flush is None:
+                    self._cancel_flush = async_call_later(
+                        self.hass, remaining, partial(self._async_flush, deadband)
+                    )
+                return
+            if deadband and _within_deadband(self._written_value, new_value, deadband):
+                return
+
+        self._async_write_value()
+
+    @callback
+    def _async_flush(self, deadband, _now):
+        """Write the value held back by the write interval."""
+        self._cancel_flush = None
+        if deadband and _within_deadband(self._written_value, self._value, deadband):
+            return
+        self._async_write_value()
+
+    @callback
+    def _async_write_value(self):
+        """Write the current value to the state machine."""
+        self._async_cancel_flush()
+        self._written_value = self._value
+        self._written_at = time.monotonic()
         self.async_write_ha_state()
 
+    @callback
+    def _async_cancel_flush(self):
+        """Cancel a pending write of a held back value."""
+        if self._cancel_flush is not None:
+            self._cancel_flush()
+            self._cancel_flush = None
+
+    @callback
+    def async_set_available(self, available):
+        """Mark the sensor unavailable while its group is disabled."""
+        if available == self._attr_available:
+            return
+        self._attr_available = available
+        if not available:
+            self._async_cancel_flush()
+        if self.hass is not None:
+            self.async_write_ha_state()
+
     async def async_added_to_hass(self):
         """Restore last known state."""
         await super().async_added_to_hass()
 
         _LOGGER.debug(f"async_added_to_hass called for {self.name}")
 
-        # Retrieve the last known state
-        last_state = await self.async_get_last_sensor_data()
-        if last_state:
-            # Log the restored state before transforming
-            _LOGGER.debug(f"Restored state for {self.name}: {last_state.native_value}")
-
-            try:
+        # Fall back to the entity's own state for devices that have not
+        # reported since the snapshot store was introduced
+        if self._value is None:
+            last_state = await self.async_get_last_sensor_data()
+            if last_state:
+                _LOGGER.debug(f"Restored state for {self.name}: {last_state.native_value}")
                 self._value = last_state.native_value
-                self.async_write_ha_state()  # Make sure the restored state is written
-            except (ValueError, TypeError):
-                _LOGGER.warning(f"Could not restore state for {self.name}")
+
+        # The state is written once the sensor is added
+        self._written_value = self._value
+        self._written_at = time.monotonic()
+
+    async def async_will_remove_from_hass(self):
+        """Drop a pending write when the sensor goes away."""
+        self._async_cancel_flush()
@@ -0,0 +1,75 @@
+"""Persistent storage for Leaf Spy."""
+import logging
+
+from homeassistant.core import callback, HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .range_model import ConsumptionModel
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.snapshot"
+STORAGE_VERSION = 1
+SAVE_DELAY = 30
+
+
+class LeafSpyStore:
+    """Hold the last frame, learned models and trips of every car in one file.
+
+    Frames received since startup are kept as LeafSpyFrame records and only
+    turned into plain dicts when written to disk.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize the store."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self.frames = {}
+        self.range_models = {}
+        self.trips = {}
+        self.current_trips = {}
+
+    async def async_load(self):
+        """Load the snapshot of every car in one read."""
+        data = await self._store.async_load() or {}
+        self.frames = data.get('frames', {})
+        self.range_models = {
+            dev_id: ConsumptionModel.from_dict(model)
+            for dev_id, model in data.get('range_models', {}).items()
+        }
+        self.trips = data.get('trips', {})
+        self.current_trips = data.get('current_trips', {})
+        _LOGGER.debug("Loaded snapshot for %s devices", len(self.frames))
+
+    @callback
+    def async_update_frame(self, dev_id, message):
+        """Remember the latest frame of a car and schedule a save."""
+        self.frames[dev_id] = message
+        self.async_schedule_save()
+
+    @callback
+    def async_schedule_save(self):
+        """Schedule a save of everything in the store."""
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    async def async_save(self):
+        """Write everything in the store now."""
+        await self._store.async_save(self._data_to_save())
+
+    @callback
+    def _data_to_save(self):
+        """Return the data to persist."""
+        return {
+            'frames': {
+                dev_id: {
+                    key: value for key, value in frame.items() if key != 'pass'
+                }
+                for dev_id, frame in self.frames.items()
+            },
+            'range_models': {
+                dev_id: model.as_dict()
+                for dev_id, model in self.range_models.items()
+            },
+            'trips': self.trips,
+            'current_trips': self.current_trips,
+        }
@@ -0,0 +1,268 @@
+"""Online trip segmentation and per-trip energy summaries."""
+import logging
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    callback,
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import DOMAIN
+from .frame import device_id, float_value
+from .pipeline import async_get_context
+from .range_model import MAX_STEP_KM, WH_PER_GID
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_GET_TRIP_SUMMARY = "get_trip_summary"
+
+ATTR_VIN = "vin"
+ATTR_TRIP = "trip"
+
+GET_TRIP_SUMMARY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_VIN): cv.string,
+        vol.Optional(ATTR_TRIP): cv.positive_int,
+    }
+)
+
+# Grade (elevation change over distance) separating climbs and descents
+# from flat stretches
+GRADE_THRESHOLD = 0.02
+# Completed trips kept per car
+MAX_TRIPS = 50
+
+CLIMB = 'climb'
+DESCENT = 'descent'
+FLAT = 'flat'
+
+
+def _new_summary(trip, odometer):
+    """Return an empty trip summary."""
+    return {
+        'trip': trip,
+        'start_odometer': odometer,
+        'distance': 0,
+        'energy': 0.0,
+        'regen': 0.0,
+        'elevation_gain': 0.0,
+        'elevation_loss': 0.0,
+        'segments': [],
+    }
+
+
+def _compact(summary):
+    """Round the totals of a finished trip for storage."""
+    rounded = {
+        key: round(value, 1) if isinstance(value, float) else value
+        for key, value in summary.items()
+    }
+    rounded['segments'] = [
+        {
+            key: round(value, 1) if isinstance(value, float) else value
+            for key, value in segment.items()
+        }
+        for segment in summary['segments']
+    ]
+    return rounded
+
+
+class TripSegmenter:
+    """Split the trip of one car into climbs, descents and flat stretches.
+
+    Energy is counted from the Gids change between consecutive frames, so
+    regen shows up whenever Gids go up while driving. It is attributed to a
+    segment once the odometer moves, which happens in whole km.
+    """
+
+    __slots__ = (
+        'summary',
+        'gids',
+        'odometer',
+        'elevation',
+        'step_energy',
+        'step_regen',
+    )
+
+    def __init__(self, summary=None):
+        """Initialize the segmenter."""
+        self.summary = summary
+        self.gids = None
+        self.odometer = None
+        self.elevation = None
+        self.step_energy = 0.0
+        self.step_regen = 0.0
+
+    def update(self, message):
+        """Process a frame. Return the summary of a trip that just ended."""
+        trip = float_value(message, 'Trip')
+        odometer = float_value(message, 'Odo')
+        gids = float_value(message, 'Gids')
+        if trip is None or odometer is None or gids is None:
+            return None
+        trip = int(trip)
+        elevation = float_value(message, 'Elv')
+
+        finished = None
+        if self.summary is None or self.summary['trip'] != trip:
+            if self.summary is not None and self.summary['distance']:
+                finished = self.summary
+            self.summary = _new_summary(trip, odometer)
+            self._reset_step(odometer, gids, elevation)
+            return finished
+
+        if message.get('PlugState', '0') != '0' or self.gids is None:
+            self._reset_step(odometer, gids, elevation)
+            return None
+
+        delta = (self.gids - gids) * WH_PER_GID
+        if delta >= 0:
+            self.step_energy += delta
+        else:
+            self.step_regen -= delta
+        self.gids = gids
+
+        step_km = odometer - self.odometer
+        if step_km == 0:
+            return None
+        if not 0 < step_km <= MAX_STEP_KM:
+            self._reset_step(odometer, gids, elevation)
+            return None
+
+        climb = 0.0
+        if elevation is not None and self.elevation is not None:
+            climb = elevation - self.elevation
+        self._add_step(step_km, climb)
+        self._reset_step(odometer, gids, elevation)
+        return None
+
+    def _reset_step(self, odometer, gids, elevation):
+        """Start a new step at the given point."""
+        self.odometer = odometer
+        self.gids = gids
+        self.elevation = elevation
+        self.step_energy = 0.0
+        self.step_regen = 0.0
+
+    def _add_step(self, step_km, climb):
+        """Add a completed step to the trip, merging it into the last segment."""
+        grade = climb / (step_km * 1000)
+        if grade > GRADE_THRESHOLD:
+            kind = CLIMB
+        elif grade < -GRADE_THRESHOLD:
+            kind = DESCENT
+        else:
+            kind = FLAT
+
+        summary = self.summary
+        summary['distance'] += step_km
+        summary['energy'] += self.step_energy
+        summary['regen'] += self.step_regen
+        if climb > 0:
+            summary['elevation_gain'] += climb
+        else:
+            summary['elevation_loss'] -= climb
+
+        segments = summary['segments']
+        if not segments or segments[-1]['kind'] != kind:
+            segments.append(
+                {
+                    'kind': kind,
+                    'distance': 0,
+                    'elevation': 0.0,
+                    'energy': 0.0,
+                    'regen': 0.0,
+                }
+            )
+        segment = segments[-1]
+        segment['distance'] += step_km
+        segment['elevation'] += climb
+        segment['energy'] += self.step_energy
+        segment['regen'] += self.step_regen
+
+
+class LeafSpyTripRecorder:
+    """Segment the trips of every car and keep their summaries."""
+
+    def __init__(self, hass: HomeAssistant, store):
+        """Initialize the recorder."""
+        self.hass = hass
+        self.store = store
+        self._segmenters = {}
+
+    def _segmenter(self, dev_id):
+        """Return the segmenter of a car, resuming a stored trip if any."""
+        segmenter = self._segmenters.get(dev_id)
+        if segmenter is None:
+            segmenter = self._segmenters[dev_id] = TripSegmenter(
+                self.store.current_trips.get(dev_id)
+            )
+        return segmenter
+
+    @callback
+    def async_start(self):
+        """Start listening for frames."""
+        return async_dispatcher_connect(self.hass, DOMAIN, self.async_handle_message)
+
+    @callback
+    def async_handle_message(self, context, message):
+        """Feed a frame to the segmenter of its car."""
+        if 'VIN' not in message:
+            return
+
+        dev_id = device_id(message['VIN'])
+        segmenter = self._segmenter(dev_id)
+        finished = segmenter.update(message)
+
+        if finished is not None:
+            trips = self.store.trips.setdefault(dev_id, [])
+            trips.append(_compact(finished))
+            del trips[:-MAX_TRIPS]
+            _LOGGER.debug("Trip %s of %s finished", finished['trip'], dev_id)
+
+        self.store.current_trips[dev_id] = segmenter.summary
+        self.store.async_schedule_save()
+
+    def trip_summary(self, dev_id, trip=None):
+        """Return the summary of a trip, by default the last finished one."""
+        trips = self.store.trips.get(dev_id, [])
+        if trip is None:
+            return trips[-1] if trips else None
+
+        current = self.store.current_trips.get(dev_id)
+        if current is not None and current['trip'] == trip:
+            return current
+        return next((summary for summary in trips if summary['trip'] == trip), None)
+
+
+@callback
+def async_setup_trip_services(hass: HomeAssistant):
+    """Register the Leaf Spy trip summary service."""
+
+    async def _get_trip_summary(call: ServiceCall) -> ServiceResponse:
+        """Handle a get_trip_summary service call."""
+        context = async_get_context(hass)
+        if context is None:
+            raise HomeAssistantError("Leaf Spy is not set up")
+
+        summary = context.trip_recorder.trip_summary(
+            device_id(call.data[ATTR_VIN]), call.data.get(ATTR_TRIP)
+        )
+        if summary is None:
+            raise HomeAssistantError("No summary for this trip")
+        return summary
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_TRIP_SUMMARY,
+        _get_trip_summary,
+        schema=GET_TRIP_SUMMARY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,64 @@
+"""Websocket API for live Leaf Spy telemetry."""
+import time
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import callback, HomeAssistant
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import DOMAIN
+from .decode import decode_frame
+
+
+@callback
+def async_setup_websocket(hass: HomeAssistant):
+    """Register the Leaf Spy websocket commands."""
+    websocket_api.async_register_command(hass, websocket_subscribe)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "leafspy/subscribe",
+        vol.Required("vin"): cv.string,
+        vol.Optional("fields"): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional("min_interval", default=0): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+    }
+)
+@callback
+def websocket_subscribe(hass: HomeAssistant, connection, msg):
+    """Stream the decoded frames of one car.
+
+    Frames of other cars are dropped server side. With min_interval, frames
+    arriving sooner than that many seconds after the last one sent are
+    skipped. With fields, only those values are decoded and sent.
+    """
+    vin = msg["vin"]
+    fields = set(msg["fields"]) if "fields" in msg else None
+    min_interval = msg["min_interval"]
+    last_sent = None
+
+    @callback
+    def _forward_frame(context, message):
+        """Forward a frame to the subscriber."""
+        nonlocal last_sent
+
+        if message.get('VIN') != vin:
+            return
+
+        now = time.monotonic()
+        if last_sent is not None and now - last_sent < min_interval:
+            return
+        last_sent = now
+
+        connection.send_message(
+            websocket_api.event_message(msg["id"], decode_frame(message, fields))
+        )
+
+    connection.subscriptions[msg["id"]] = async_dispatcher_connect(
+        hass, DOMAIN, _forward_frame
+    )
+    connection.send_result(msg["id"])
@@ -0,0 +1,144 @@
+"""Benchmark Leaf Spy upload parsing and the memory kept per vehicle.
+
+Compares the old path, where aiohttp's ``request.query`` MultiDict is built
+from the URL and then read, with ``parse_query`` reading the raw query
+string into a ``LeafSpyFrame``.
+
+It then measures, with tracemalloc, the bytes kept per vehicle for its last
+frame, its position and the device id held by each of its entities: the old
+MultiDict, position dict and one slugified id per entity against
+``LeafSpyFrame``, ``LeafSpyPosition`` and the shared ``device_id``.
+
+Run from the repository root with Home Assistant installed:
+
+    python scripts/bench_frame.py
+"""
+from pathlib import Path
+import sys
+import timeit
+import tracemalloc
+
+from yarl import URL
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# pylint: disable=wrong-import-position
+from homeassistant.util import slugify
+
+from custom_components.leafspy import frame
+from custom_components.leafspy.binary_sensor import BINARY_SENSOR_TYPES
+from custom_components.leafspy.device_tracker import LeafSpyPosition
+from custom_components.leafspy.sensor import RANGE_SENSOR_TYPES, SENSOR_TYPES
+
+# A typical upload, including keys the integration does not read
+QUERY = (
+    "user=x&pass=abc123def456&DevBat=80&Gids=215&Lat=-36.8485&Long=174.7633"
+    "&Elv=12.5&Trip=55&Odo=42011&SOC=81.23&AHr=52.1&BatTemp=18.2&Amb=14&Wpr=8"
+    "&PlugState=0&ChrgMode=0&ChrgPwr=0&VIN=SJNFAAZE0U6000000&PwrSw=1&Tunits=C"
+    "&RPM=3000&SOH=84.5&Hx=90.1&Speed=13.4&BatVolts=380.2&BatAmps=-12.5"
+    "&ID=my%20leaf&Cell0=4012&Cell1=4015&Seq="
+)
+UPLOADS = 100_000
+VEHICLES = 1_000
+
+# Sensors, binary sensors and the device tracker of one car
+ENTITIES_PER_VEHICLE = (
+    len(SENSOR_TYPES) + len(RANGE_SENSOR_TYPES) + len(BINARY_SENSOR_TYPES) + 1
+)
+
+
+def bench_parsing():
+    """Print the time per upload of both parsing paths."""
+    keys = frame.LEAFSPY_KEYS
+
+    # Fresh URLs so yarl's caches don't hide the parsing cost
+    urls = [URL(f"/api/leafspy/update?{QUERY}{i}") for i in range(UPLOADS)]
+    iterator = iter(urls)
+
+    def multidict_path():
+        message = next(iterator).query
+        for key in keys:
+            message.get(key)
+
+    seconds = timeit.timeit(multidict_path, number=UPLOADS)
+    print(f"request.query (MultiDict): {seconds / UPLOADS * 1e6:6.2f} us/upload")
+
+    urls = [URL(f"/api/leafspy/update?{QUERY}{i}") for i in range(UPLOADS)]
+    iterator = iter(urls)
+
+    def frame_path():
+        message = frame.parse_query(next(iterator).raw_query_string)
+        for key in keys:
+            message.get(key)
+
+    seconds = timeit.timeit(frame_path, number=UPLOADS)
+    print(f"parse_query (LeafSpyFrame): {seconds / UPLOADS * 1e6:5.2f} us/upload")
+
+
+def _vehicle_query(number):
+    """Return an upload of one car of the fleet."""
+    return QUERY.replace("SJNFAAZE0U6000000", f"SJNFAAZE0U6{number:06}")
+
+
+def _old_vehicle(url):
+    """Return what the old code kept for one car."""
+    message = url.query
+    position = {
+        'latitude': float(message['Lat']),
+        'longitude': float(message['Long']),
+        'battery_level': float(message['DevBat']),
+    }
+    ids = [
+        slugify(f'leaf_{message["VIN"]}') for _ in range(ENTITIES_PER_VEHICLE)
+    ]
+    return message, position, ids
+
+
+def _new_vehicle(url):
+    """Return what the integration keeps for one car now."""
+    message = frame.parse_query(url.raw_query_string)
+    position = LeafSpyPosition(
+        float(message['Lat']),
+        float(message['Long']),
+        float(message['DevBat']),
+    )
+    ids = [frame.device_id(message['VIN'])] * ENTITIES_PER_VEHICLE
+    return message, position, ids
+
+
+def _bytes_per_vehicle(build):
+    """Return the bytes still allocated per car after building the fleet."""
+    urls = [URL(f"/api/leafspy/update?{_vehicle_query(i)}") for i in range(VEHICLES)]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    fleet = [build(url) for url in urls]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    # Only count what building the fleet allocated, not the URLs themselves
+    size = sum(
+        stat.size_diff
+        for stat in after.compare_to(before, 'filename')
+        if stat.size_diff > 0
+    )
+    del fleet
+    return size / VEHICLES
+
+
+def bench_memory():
+    """Print the bytes kept per vehicle by the old and new records."""
+    old = _bytes_per_vehicle(_old_vehicle)
+    print(f"MultiDict, dict, {ENTITIES_PER_VEHICLE} ids: {old:8.0f} bytes/vehicle")
+    new = _bytes_per_vehicle(_new_vehicle)
+    print(f"LeafSpyFrame, LeafSpyPosition, shared id: {new:5.0f} bytes/vehicle")
+
+
+def main():
+    """Run the benchmarks."""
+    bench_parsing()
+    bench_memory()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
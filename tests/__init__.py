@@ -0,0 +1,41 @@
+"""Tests for the Leaf Spy integration."""
+from custom_components.leafspy.const import URL_LEAFSPY_PATH
+
+SECRET = "abc123"
+VIN = 'SJNFAAZE0U6000000'
+DEVICE_ID = 'leaf_sjnfaaze0u6000000'
+
+UPLOAD = {
+    'pass': SECRET,
+    'VIN': VIN,
+    'Lat': '-36.8485',
+    'Long': '174.7633',
+    'Elv': '12.5',
+    'Seq': '1',
+    'Trip': '55',
+    'Odo': '42011',
+    'SOC': '81.23',
+    'AHr': '52.1',
+    'BatTemp': '18.2',
+    'Amb': '14',
+    'Wpr': '8',
+    'PlugState': '0',
+    'ChrgMode': '0',
+    'ChrgPwr': '0',
+    'PwrSw': '1',
+    'Gids': '215',
+    'SOH': '84.5',
+    'Hx': '90.1',
+    'Speed': '13.4',
+    'BatVolts': '380.2',
+    'BatAmps': '-12.5',
+    'RPM': '3000',
+    'DevBat': '80',
+}
+
+
+async def async_upload(hass, client, **changes):
+    """Send an upload and wait for it to be dispatched."""
+    response = await client.get(URL_LEAFSPY_PATH, params={**UPLOAD, **changes})
+    assert response.status == 200
+    await hass.async_block_till_done()
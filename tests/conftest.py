@@ -0,0 +1,8 @@
+"""Fixtures for Leaf Spy tests."""
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Enable loading the integration from custom_components."""
+    yield
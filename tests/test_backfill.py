@@ -0,0 +1,128 @@
+"""Tests for importing backfilled Leaf Spy samples into statistics."""
+from datetime import timedelta
+from functools import partial
+
+import pytest
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.statistics import (
+    get_metadata,
+    statistics_during_period,
+)
+from homeassistant.const import UnitOfTemperature
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.components.recorder.common import (
+    async_wait_recording_done,
+)
+
+from custom_components.leafspy.const import CONF_SECRET, DOMAIN
+
+from . import DEVICE_ID, SECRET, VIN, async_upload
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(recorder_db_url, enable_custom_integrations):
+    """Enable custom integrations once the recorder database is prepared."""
+    yield
+
+
+async def _async_statistics(hass, entity_id, start):
+    """Return the hourly statistics rows of an entity, keyed by start."""
+    stats = await get_instance(hass).async_add_executor_job(
+        statistics_during_period,
+        hass,
+        start,
+        None,
+        {entity_id},
+        "hour",
+        None,
+        {"mean", "min", "max"},
+    )
+    return {
+        dt_util.utc_from_timestamp(row["start"]): row
+        for row in stats.get(entity_id, [])
+    }
+
+
+async def _async_import(hass, samples):
+    """Call the import service and wait for the recorder to write the rows."""
+    await hass.services.async_call(
+        DOMAIN,
+        "import_statistics",
+        {
+            "vin": VIN,
+            "samples": [
+                {"time": when.isoformat(), **values} for when, values in samples
+            ],
+        },
+        blocking=True,
+    )
+    await async_wait_recording_done(hass)
+
+
+async def test_import_statistics(recorder_mock, hass, hass_client_no_auth):
+    """Samples become time-weighted hourly rows in the entity's display unit."""
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_SECRET: SECRET})
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    await async_upload(hass, await hass_client_no_auth())
+
+    ent_reg = er.async_get(hass)
+    soc_id = ent_reg.async_get_entity_id(
+        'sensor', DOMAIN, f"{DEVICE_ID}_battery_state_of_charge"
+    )
+    temperature_id = ent_reg.async_get_entity_id(
+        'sensor', DOMAIN, f"{DEVICE_ID}_battery_temperature"
+    )
+    ent_reg.async_update_entity_options(
+        temperature_id,
+        "sensor",
+        {"unit_of_measurement": UnitOfTemperature.FAHRENHEIT},
+    )
+    await hass.async_block_till_done()
+
+    first = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
+    first -= timedelta(hours=5)
+    second = first + timedelta(hours=1)
+
+    await _async_import(
+        hass,
+        [
+            (first, {'SOC': '80', 'BatTemp': '10'}),
+            (first + timedelta(minutes=30), {'BatTemp': '20'}),
+            (first + timedelta(minutes=45), {'SOC': '60'}),
+            (second + timedelta(minutes=30), {'SOC': '50'}),
+            # Not compiled by the recorder yet
+            (dt_util.utcnow(), {'SOC': '10'}),
+        ],
+    )
+
+    rows = await _async_statistics(hass, soc_id, first)
+    assert list(rows) == [first, second]
+    # 80 for 45 minutes, then 60 for 15
+    assert rows[first]["mean"] == 75
+    assert (rows[first]["min"], rows[first]["max"]) == (60, 80)
+    # 60 held over for 30 minutes, then 50 for 30
+    assert rows[second]["mean"] == 55
+    assert (rows[second]["min"], rows[second]["max"]) == (50, 60)
+
+    # Imported in the display unit, 10 °C and 20 °C being 50 °F and 68 °F
+    rows = await _async_statistics(hass, temperature_id, first)
+    assert list(rows) == [first]
+    assert rows[first]["mean"] == 59
+    assert (rows[first]["min"], rows[first]["max"]) == (50, 68)
+    metadata = await get_instance(hass).async_add_executor_job(
+        partial(get_metadata, hass, statistic_ids={temperature_id})
+    )
+    assert (
+        metadata[temperature_id][1]["unit_of_measurement"]
+        == UnitOfTemperature.FAHRENHEIT
+    )
+
+    # Hours that already have statistics are left alone
+    await _async_import(hass, [(first + timedelta(minutes=10), {'SOC': '10'})])
+    rows = await _async_statistics(hass, soc_id, first)
+    assert rows[first]["mean"] == 75
@@ -0,0 +1,37 @@
+"""Tests for the Leaf Spy binary sensors."""
+from homeassistant.const import STATE_ON
+from homeassistant.core import State
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    mock_restore_cache,
+)
+
+from custom_components.leafspy.const import CONF_SECRET, DOMAIN
+
+from . import DEVICE_ID, SECRET
+
+ENTITY_ID = 'binary_sensor.leaf_power'
+
+
+async def test_restore_without_snapshot(hass):
+    """A car missing from the snapshot comes back with its last state."""
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_SECRET: SECRET})
+    entry.add_to_hass(hass)
+    device = dr.async_get(hass).async_get_or_create(
+        config_entry_id=entry.entry_id, identifiers={(DOMAIN, DEVICE_ID)}
+    )
+    er.async_get(hass).async_get_or_create(
+        'binary_sensor',
+        DOMAIN,
+        f"{DEVICE_ID}_power",
+        suggested_object_id='leaf_power',
+        config_entry=entry,
+        device_id=device.id,
+    )
+    mock_restore_cache(hass, [State(ENTITY_ID, STATE_ON)])
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert hass.states.get(ENTITY_ID).state == STATE_ON
@@ -0,0 +1,74 @@
+"""Tests for the Leaf Spy options flow."""
+from homeassistant.data_entry_flow import FlowResultType
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.leafspy.const import (
+    CONF_DEADBAND,
+    CONF_ENABLED_GROUPS,
+    CONF_GPS_MIN_DISTANCE,
+    CONF_MQTT_BATCH_WINDOW,
+    CONF_QUEUE_SIZE,
+    CONF_SECRET,
+    CONF_WRITE_INTERVAL,
+    DOMAIN,
+    GROUP_BATTERY,
+    GROUP_DRIVING,
+)
+from custom_components.leafspy.pipeline import group_option
+
+from . import SECRET
+
+
+async def test_options_flow(hass):
+    """Both option steps run and the pipeline picks up the result."""
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_SECRET: SECRET})
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    assert result['type'] == FlowResultType.FORM
+    assert result['step_id'] == 'init'
+
+    result = await hass.config_entries.options.async_configure(
+        result['flow_id'],
+        user_input={
+            CONF_ENABLED_GROUPS: [GROUP_BATTERY, GROUP_DRIVING],
+            CONF_GPS_MIN_DISTANCE: 25,
+            CONF_QUEUE_SIZE: 50,
+            CONF_MQTT_BATCH_WINDOW: 0,
+        },
+    )
+    assert result['type'] == FlowResultType.FORM
+    assert result['step_id'] == 'groups'
+    assert set(result['data_schema'].schema) == {
+        group_option(GROUP_BATTERY, CONF_WRITE_INTERVAL),
+        group_option(GROUP_BATTERY, CONF_DEADBAND),
+        group_option(GROUP_DRIVING, CONF_WRITE_INTERVAL),
+        group_option(GROUP_DRIVING, CONF_DEADBAND),
+    }
+
+    result = await hass.config_entries.options.async_configure(
+        result['flow_id'],
+        user_input={
+            group_option(GROUP_BATTERY, CONF_WRITE_INTERVAL): 30,
+            group_option(GROUP_BATTERY, CONF_DEADBAND): 0.5,
+        },
+    )
+    assert result['type'] == FlowResultType.CREATE_ENTRY
+    await hass.async_block_till_done()
+
+    options = entry.runtime_data.options
+    assert options.enabled_groups == {GROUP_BATTERY, GROUP_DRIVING}
+    assert options.gps_min_distance == 25
+    assert options.queue_size == 50
+    assert options.write_interval(GROUP_BATTERY) == 30
+    assert options.deadband(GROUP_BATTERY) == 0.5
+    assert options.write_interval(GROUP_DRIVING) == 0
+
+    # The second run starts from the saved options
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    queue_size = next(
+        key for key in result['data_schema'].schema if key == CONF_QUEUE_SIZE
+    )
+    assert queue_size.default() == 50
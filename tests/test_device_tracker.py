@@ -0,0 +1,32 @@
+"""Tests for the Leaf Spy device tracker."""
+from homeassistant.const import ATTR_BATTERY_LEVEL, ATTR_LATITUDE
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.leafspy.const import CONF_GPS_MIN_DISTANCE, CONF_SECRET, DOMAIN
+
+from . import SECRET, async_upload
+
+
+async def test_gps_min_distance_keeps_battery_level(hass, hass_client_no_auth):
+    """A small move keeps the last coordinates but updates the battery level."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_SECRET: SECRET},
+        options={CONF_GPS_MIN_DISTANCE: 100},
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    client = await hass_client_no_auth()
+
+    await async_upload(hass, client, Lat='-36.8485', SOC='81')
+    await async_upload(hass, client, Lat='-36.8486', SOC='80')
+
+    state = hass.states.get('device_tracker.leaf')
+    assert state.attributes[ATTR_LATITUDE] == -36.8485
+    assert state.attributes[ATTR_BATTERY_LEVEL] == 80
+
+    await async_upload(hass, client, Lat='-36.8585', SOC='80')
+
+    state = hass.states.get('device_tracker.leaf')
+    assert state.attributes[ATTR_LATITUDE] == -36.8585
@@ -0,0 +1,54 @@
+"""Tests for parsing Leaf Spy uploads."""
+import pytest
+
+from custom_components.leafspy.frame import device_id, parse_query
+
+
+def test_first_value_wins():
+    """A repeated key keeps its first value."""
+    frame = parse_query('VIN=first&SOC=81&VIN=second')
+    assert frame['VIN'] == 'first'
+    assert frame['SOC'] == '81'
+
+
+def test_decoding():
+    """Values are unquoted, with + as a space."""
+    frame = parse_query('VIN=my+leaf%2F1&SOC=81.5')
+    assert frame['VIN'] == 'my leaf/1'
+    assert frame['SOC'] == '81.5'
+
+
+def test_unknown_and_blank_keys():
+    """Unknown and empty keys are dropped; blank values are kept."""
+    frame = parse_query('user=x&&=y&Tunits=C&Seq=&Odo')
+    assert frame.items() == [('Seq', ''), ('Odo', '')]
+    assert 'user' not in frame
+    assert '' not in frame
+    assert frame.get('Tunits') is None
+
+
+def test_lookups_only_see_keys():
+    """Attributes of the frame are not mistaken for keys."""
+    frame = parse_query('VIN=abc')
+    assert frame.get('get') is None
+    assert frame.get('items', 'default') == 'default'
+    assert 'get' not in frame
+    with pytest.raises(KeyError):
+        frame['get']
+    with pytest.raises(KeyError):
+        frame['SOC']
+
+
+def test_password_hidden_from_repr():
+    """The password never shows up in logs."""
+    frame = parse_query('pass=secret&VIN=abc')
+    assert frame['pass'] == 'secret'
+    assert 'secret' not in repr(frame)
+
+
+def test_device_id_is_shared():
+    """Every lookup of a VIN returns the same string."""
+    vin = 'SJNFAAZE0U6000000'
+    assert device_id(vin) == 'leaf_sjnfaaze0u6000000'
+    # A VIN parsed from another upload is a different string object
+    assert device_id(vin) is device_id(f'SJNFAAZE0U{6000000}')
@@ -0,0 +1,111 @@
+"""Tests for setting up and reloading Leaf Spy."""
+from collections import Counter
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.leafspy.binary_sensor import LeafSpyBinarySensor
+from custom_components.leafspy.const import CONF_SECRET, DOMAIN
+from custom_components.leafspy.device_tracker import LeafSpyDeviceTracker
+from custom_components.leafspy.frame import parse_query
+from custom_components.leafspy.range_model import ConsumptionModel
+from custom_components.leafspy.sensor import LeafSpySensor
+from custom_components.leafspy.store import STORAGE_KEY, LeafSpyStore
+from custom_components.leafspy.trips import TripSegmenter
+
+from . import DEVICE_ID, SECRET, VIN, async_upload
+
+RELOADS = 3
+
+
+def _spy(cls, name):
+    """Patch a method so its calls are counted while it still runs."""
+    return patch.object(cls, name, autospec=True, side_effect=getattr(cls, name))
+
+
+async def test_reload_keeps_one_handler_per_upload(hass, hass_client_no_auth):
+    """Every platform handles an upload once, however often the entry reloaded."""
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_SECRET: SECRET})
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    client = await hass_client_no_auth()
+
+    # Create the car, so the entities exist before the reloads
+    await async_upload(hass, client)
+
+    for _ in range(RELOADS):
+        assert await hass.config_entries.async_reload(entry.entry_id)
+        await hass.async_block_till_done()
+
+    with _spy(LeafSpySensor, 'update_state') as sensor_update, _spy(
+        LeafSpySensor, 'async_write_ha_state'
+    ) as sensor_write, _spy(
+        LeafSpyBinarySensor, 'update_state'
+    ) as binary_update, _spy(
+        LeafSpyBinarySensor, 'async_write_ha_state'
+    ) as binary_write, _spy(
+        LeafSpyDeviceTracker, 'update_data'
+    ) as tracker_update, _spy(
+        LeafSpyDeviceTracker, 'async_write_ha_state'
+    ) as tracker_write, _spy(
+        ConsumptionModel, 'update'
+    ) as model_update, _spy(
+        TripSegmenter, 'update'
+    ) as trip_update:
+        await async_upload(hass, client, Seq='2', Odo='42012', DevBat='79')
+
+    context = entry.runtime_data
+    for spy, entities in (
+        (sensor_update, context.sensors.values()),
+        (sensor_write, context.sensors.values()),
+        (binary_update, context.binary_sensors.values()),
+        (binary_write, context.binary_sensors.values()),
+        (tracker_update, context.devices.values()),
+        (tracker_write, context.devices.values()),
+    ):
+        assert entities
+        calls = Counter(call.args[0] for call in spy.call_args_list)
+        assert calls == Counter(entities)
+
+    assert model_update.call_count == 1
+    assert trip_update.call_count == 1
+
+
+async def test_unload_writes_snapshot(hass, hass_client_no_auth, hass_storage):
+    """The snapshot is written on unload instead of after the save delay."""
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_SECRET: SECRET})
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    client = await hass_client_no_auth()
+    await async_upload(hass, client, Seq='7')
+    assert STORAGE_KEY not in hass_storage
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    frame = hass_storage[STORAGE_KEY]['data']['frames'][DEVICE_ID]
+    assert frame['Seq'] == '7'
+    assert 'pass' not in frame
+
+
+async def test_unload_stops_queue_before_saving(hass, hass_client_no_auth):
+    """An upload still queued at unload doesn't schedule a save afterwards."""
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_SECRET: SECRET})
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    await async_upload(hass, await hass_client_no_auth())
+
+    entry.runtime_data.async_enqueue(
+        parse_query(f'VIN={VIN}&Lat=-36.8&Long=174.7&SOC=80&Odo=42012&Gids=213')
+    )
+    with _spy(LeafSpyStore, 'async_schedule_save') as schedule_save, _spy(
+        LeafSpyStore, 'async_save'
+    ) as save:
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+    assert save.call_count == 1
+    assert schedule_save.call_count == 0
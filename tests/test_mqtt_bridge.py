@@ -0,0 +1,143 @@
+"""Tests for republishing Leaf Spy frames to MQTT."""
+from datetime import timedelta
+import json
+from unittest.mock import patch
+
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.leafspy.const import (
+    CONF_DEADBAND,
+    CONF_MQTT_BATCH_WINDOW,
+    CONF_MQTT_TOPIC,
+    CONF_SECRET,
+    DOMAIN,
+    GROUP_BATTERY,
+)
+from custom_components.leafspy.frame import parse_query
+from custom_components.leafspy.mqtt_bridge import LeafSpyMqttBridge
+from custom_components.leafspy.pipeline import group_option
+
+from . import SECRET
+
+
+class FakeBroker:
+    """Collect what the bridge publishes instead of sending it to a broker."""
+
+    def __init__(self):
+        """Initialize the broker."""
+        self.messages = []
+
+    async def async_publish(self, hass, topic, payload):
+        """Record a published message."""
+        self.messages.append((topic, json.loads(payload)))
+
+
+def _send(hass, query):
+    """Dispatch an upload to every listener."""
+    async_dispatcher_send(hass, DOMAIN, None, parse_query(query))
+
+
+async def test_publish_each_frame(hass):
+    """Without a batch window, every frame is published on its VIN's topic."""
+    broker = FakeBroker()
+    bridge = LeafSpyMqttBridge(hass, 'leafspy/', publish=broker.async_publish)
+    bridge.async_start()
+
+    _send(hass, 'pass=x&VIN=ABC&SOC=81.5&Lat=1.5')
+    await hass.async_block_till_done()
+
+    assert broker.messages == [
+        (
+            'leafspy/ABC',
+            {'battery_state_of_charge': 81.5, 'vin': 'ABC', 'latitude': 1.5},
+        )
+    ]
+    await bridge.async_stop()
+
+
+async def test_batch_window(hass):
+    """Frames of a batch window are published as one list per VIN."""
+    broker = FakeBroker()
+    bridge = LeafSpyMqttBridge(hass, 'leafspy', 10, broker.async_publish)
+    bridge.async_start()
+
+    _send(hass, 'VIN=ABC&SOC=81')
+    _send(hass, 'VIN=DEF&SOC=50')
+    _send(hass, 'VIN=ABC&SOC=80')
+    await hass.async_block_till_done()
+    assert broker.messages == []
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=11))
+    await hass.async_block_till_done()
+
+    assert sorted(broker.messages) == [
+        (
+            'leafspy/ABC',
+            [
+                {'battery_state_of_charge': 81.0, 'vin': 'ABC'},
+                {'battery_state_of_charge': 80.0, 'vin': 'ABC'},
+            ],
+        ),
+        ('leafspy/DEF', [{'battery_state_of_charge': 50.0, 'vin': 'DEF'}]),
+    ]
+    await bridge.async_stop()
+
+
+async def test_stop_publishes_pending_frames(hass):
+    """Stopping the bridge publishes the frames of an open batch window."""
+    broker = FakeBroker()
+    bridge = LeafSpyMqttBridge(hass, 'leafspy', 10, broker.async_publish)
+    bridge.async_start()
+
+    _send(hass, 'VIN=ABC&SOC=81')
+    await hass.async_block_till_done()
+    await bridge.async_stop()
+
+    assert broker.messages == [
+        ('leafspy/ABC', [{'battery_state_of_charge': 81.0, 'vin': 'ABC'}])
+    ]
+
+    # Nothing is left to publish when the window would have closed
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=11))
+    await hass.async_block_till_done()
+    assert len(broker.messages) == 1
+
+
+async def test_restart_only_on_bridge_options(hass):
+    """Only a changed topic or batch window replaces the running bridge."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_SECRET: SECRET},
+        options={CONF_MQTT_TOPIC: 'leafspy', CONF_MQTT_BATCH_WINDOW: 10},
+    )
+    entry.add_to_hass(hass)
+    with patch(
+        'custom_components.leafspy.mqtt.async_wait_for_mqtt_client',
+        return_value=True,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        bridge = entry.runtime_data.mqtt_bridge
+        assert bridge is not None
+
+        hass.config_entries.async_update_entry(
+            entry,
+            options={**entry.options, group_option(GROUP_BATTERY, CONF_DEADBAND): 1},
+        )
+        await hass.async_block_till_done()
+        assert entry.runtime_data.mqtt_bridge is bridge
+
+        hass.config_entries.async_update_entry(
+            entry, options={**entry.options, CONF_MQTT_BATCH_WINDOW: 5}
+        )
+        await hass.async_block_till_done()
+        assert entry.runtime_data.mqtt_bridge is not bridge
+        assert entry.runtime_data.mqtt_bridge.batch_window == 5
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        assert entry.runtime_data.mqtt_bridge is None
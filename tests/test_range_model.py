@@ -0,0 +1,80 @@
+"""Tests for the learned consumption model."""
+import pytest
+
+from custom_components.leafspy.range_model import (
+    DEFAULT_WH_PER_KM,
+    WH_PER_GID,
+    ConsumptionModel,
+    _histogram_bin,
+)
+
+
+def _frame(odometer, gids, speed_kmh=72, temperature=15, **extra):
+    """Return a driving frame."""
+    return {
+        'Odo': str(odometer),
+        'Gids': str(gids),
+        'Speed': str(speed_kmh / 3.6),
+        'Amb': str(temperature),
+        **extra,
+    }
+
+
+def test_learns_bin():
+    """Each km is counted in the bin of its speed and temperature."""
+    model = ConsumptionModel()
+    for km in range(6):
+        model.update(_frame(100 + km, 200 - 2 * km))
+
+    index = _histogram_bin(72, 15)
+    assert model.distance[index] == 5
+    assert model.energy[index] == pytest.approx(5 * 2 * WH_PER_GID)
+    assert model.consumption(72, 15) == pytest.approx(2 * WH_PER_GID)
+    assert sum(model.distance) == 5
+
+
+def test_step_binned_by_average():
+    """A km ending at a standstill is binned by its average speed."""
+    model = ConsumptionModel()
+    model.update(_frame(100, 200, speed_kmh=50))
+    model.update(_frame(100, 199, speed_kmh=50))
+    model.update(_frame(101, 198, speed_kmh=20))
+
+    assert model.distance[_histogram_bin(40, 15)] == 1
+    assert model.distance[_histogram_bin(20, 15)] == 0
+
+
+def test_gap_is_not_learned():
+    """A jump in the odometer moves the anchor without learning."""
+    model = ConsumptionModel()
+    model.update(_frame(100, 200))
+    model.update(_frame(120, 150))
+    assert sum(model.distance) == 0
+
+    model.update(_frame(121, 148))
+    assert sum(model.distance) == 1
+    assert sum(model.energy) == pytest.approx(2 * WH_PER_GID)
+
+
+def test_charging_resets_anchor():
+    """Gids gained while charging are not counted against the next km."""
+    model = ConsumptionModel()
+    model.update(_frame(100, 100))
+    model.update(_frame(100, 250, PlugState='1'))
+    assert model.anchor is None
+
+    model.update(_frame(100, 250))
+    model.update(_frame(101, 248))
+    assert sum(model.distance) == 1
+    assert sum(model.energy) == pytest.approx(2 * WH_PER_GID)
+
+
+def test_estimate_defaults():
+    """An untrained model estimates range with the default consumption."""
+    model = ConsumptionModel()
+    estimate = model.estimate(_frame(100, 200, AHr='50', SOC='50', ChrgPwr='3000'))
+    assert estimate['estimated_range'] == round(
+        200 * WH_PER_GID / DEFAULT_WH_PER_KM, 1
+    )
+    # 50 Ah at 360 V is 18 kWh, half of it missing, at 3 kW
+    assert estimate['time_to_full'] == 180
@@ -0,0 +1,81 @@
+"""Tests for the Leaf Spy sensors."""
+from datetime import timedelta
+
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.leafspy.const import (
+    CONF_ENABLED_GROUPS,
+    CONF_SECRET,
+    CONF_WRITE_INTERVAL,
+    DOMAIN,
+    GROUP_BATTERY,
+    SENSOR_GROUPS,
+)
+from custom_components.leafspy.pipeline import group_option
+
+from . import DEVICE_ID, SECRET, async_upload
+
+
+async def _async_setup(hass, options):
+    """Set up an entry with the given options."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, data={CONF_SECRET: SECRET}, options=options
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+def _state(hass, key):
+    """Return the state of a sensor of the test car."""
+    entity_id = er.async_get(hass).async_get_entity_id(
+        'sensor', DOMAIN, f"{DEVICE_ID}_{key}"
+    )
+    return hass.states.get(entity_id).state
+
+
+async def test_write_interval_flushes_latest_value(hass, hass_client_no_auth):
+    """A value held back by the write interval is written once it passed."""
+    await _async_setup(hass, {group_option(GROUP_BATTERY, CONF_WRITE_INTERVAL): 60})
+    client = await hass_client_no_auth()
+
+    await async_upload(hass, client, SOC='81')
+    await async_upload(hass, client, SOC='80')
+    await async_upload(hass, client, SOC='79')
+    assert _state(hass, 'battery_state_of_charge') == '81.0'
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+    await hass.async_block_till_done()
+    assert _state(hass, 'battery_state_of_charge') == '79.0'
+
+
+async def test_disabled_group(hass, hass_client_no_auth):
+    """Sensors of a disabled group go unavailable and are not recreated."""
+    entry = await _async_setup(hass, {})
+    client = await hass_client_no_auth()
+    await async_upload(hass, client)
+    assert _state(hass, 'battery_state_of_charge') != STATE_UNAVAILABLE
+
+    enabled_groups = [group for group in SENSOR_GROUPS if group != GROUP_BATTERY]
+    hass.config_entries.async_update_entry(
+        entry, options={CONF_ENABLED_GROUPS: enabled_groups}
+    )
+    await hass.async_block_till_done()
+    assert _state(hass, 'battery_state_of_charge') == STATE_UNAVAILABLE
+    assert _state(hass, 'phone_battery') != STATE_UNAVAILABLE
+
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+    await async_upload(hass, client, SOC='80')
+
+    sensors = entry.runtime_data.sensors
+    assert f"{DEVICE_ID}_battery_state_of_charge" not in sensors
+    assert f"{DEVICE_ID}_phone_battery" in sensors
+    assert _state(hass, 'battery_state_of_charge') == STATE_UNAVAILABLE
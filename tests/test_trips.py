@@ -0,0 +1,91 @@
+"""Tests for trip segmentation."""
+import pytest
+
+from custom_components.leafspy.range_model import WH_PER_GID
+from custom_components.leafspy.trips import CLIMB, DESCENT, FLAT, TripSegmenter
+
+
+def _frame(trip, odometer, gids, elevation=0, **extra):
+    """Return a driving frame."""
+    return {
+        'Trip': str(trip),
+        'Odo': str(odometer),
+        'Gids': str(gids),
+        'Elv': str(elevation),
+        **extra,
+    }
+
+
+def test_segments_merge():
+    """Consecutive km of the same kind merge into one segment."""
+    segmenter = TripSegmenter()
+    for odometer, elevation in (
+        (100, 0),
+        (101, 50),
+        (102, 100),
+        (103, 100),
+        (104, 50),
+    ):
+        assert segmenter.update(_frame(1, odometer, 200, elevation)) is None
+
+    summary = segmenter.summary
+    assert [
+        (segment['kind'], segment['distance']) for segment in summary['segments']
+    ] == [(CLIMB, 2), (FLAT, 1), (DESCENT, 1)]
+    assert summary['distance'] == 4
+    assert summary['elevation_gain'] == 100
+    assert summary['elevation_loss'] == 50
+
+
+def test_regen():
+    """Gids gained while driving count as regen, not as negative energy."""
+    segmenter = TripSegmenter()
+    segmenter.update(_frame(1, 100, 200))
+    segmenter.update(_frame(1, 100, 196))
+    segmenter.update(_frame(1, 101, 197))
+
+    summary = segmenter.summary
+    assert summary['energy'] == pytest.approx(4 * WH_PER_GID)
+    assert summary['regen'] == pytest.approx(WH_PER_GID)
+    assert summary['segments'][0]['regen'] == pytest.approx(WH_PER_GID)
+
+
+def test_charging_is_not_counted():
+    """Gids gained while plugged in are neither energy nor regen."""
+    segmenter = TripSegmenter()
+    segmenter.update(_frame(1, 100, 100))
+    segmenter.update(_frame(1, 100, 200, PlugState='1'))
+    segmenter.update(_frame(1, 101, 198))
+
+    summary = segmenter.summary
+    assert summary['energy'] == pytest.approx(2 * WH_PER_GID)
+    assert summary['regen'] == 0
+
+
+def test_trip_rollover():
+    """A new trip number finishes the previous trip if it went anywhere."""
+    segmenter = TripSegmenter()
+    segmenter.update(_frame(1, 100, 200))
+    segmenter.update(_frame(1, 101, 198))
+
+    finished = segmenter.update(_frame(2, 101, 198))
+    assert finished['trip'] == 1
+    assert finished['distance'] == 1
+    assert segmenter.summary['trip'] == 2
+    assert segmenter.summary['distance'] == 0
+
+    # A trip that never moved is dropped
+    assert segmenter.update(_frame(3, 101, 198)) is None
+    assert segmenter.summary['trip'] == 3
+
+
+def test_gap_is_skipped():
+    """A jump in the odometer is not counted as driving."""
+    segmenter = TripSegmenter()
+    segmenter.update(_frame(1, 100, 200))
+    segmenter.update(_frame(1, 110, 150))
+    segmenter.update(_frame(1, 111, 148))
+
+    summary = segmenter.summary
+    assert summary['distance'] == 1
+    assert summary['energy'] == pytest.approx(2 * WH_PER_GID)